@@ -9,7 +9,7 @@ import numpy as np
 import astropy.units as u
 
 
-__all__ = ['Base', 'BaseTaskBase', 'SetAttribute', 'TaskBase',
+__all__ = ['Base', 'BaseTaskBase', 'SetAttribute', 'TimeSlice', 'TaskBase',
            'Task', 'PaddedTaskBase']
 
 
@@ -273,25 +273,10 @@ class Base:
             The first dimension is sample-time, and the remainder given by
             `sample_shape`.
         """
-        if self.closed:
-            raise ValueError("I/O operation on closed task/generator.")
-
         # NOTE: this will return an EOF error when attempting to read partial
         # frames, making it identical to fh.read().
-
-        samples_left = max(0, self.shape[0] - self.offset)
-        if out is None:
-            if count is None or count < 0:
-                count = samples_left
-            out = np.empty((count,) + self.shape[1:], dtype=self.dtype)
-        else:
-            assert out.shape[1:] == self.shape[1:], (
-                "'out' should have trailing shape {}".format(self.sample_shape))
-            count = out.shape[0]
-
-        # TODO: should this just return the maximum possible?
-        if count > samples_left:
-            raise EOFError("cannot read from beyond end of input.")
+        out = self._get_read_output(count, out)
+        count = out.shape[0]
 
         offset0 = self.offset
         sample = 0
@@ -317,6 +302,31 @@ class Base:
 
         return out
 
+    def _get_read_output(self, count, out):
+        """Check arguments to read, and create the output array if needed.
+
+        Parameters are as for `read`.  Returns the array to store the data
+        in, whose length is the number of samples to read.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed task/generator.")
+
+        samples_left = max(0, self.shape[0] - self.offset)
+        if out is None:
+            if count is None or count < 0:
+                count = samples_left
+            out = np.empty((count,) + self.shape[1:], dtype=self.dtype)
+        else:
+            assert out.shape[1:] == self.shape[1:], (
+                "'out' should have trailing shape {}".format(self.sample_shape))
+            count = out.shape[0]
+
+        # TODO: should this just return the maximum possible?
+        if count > samples_left:
+            raise EOFError("cannot read from beyond end of input.")
+
+        return out
+
     def __enter__(self):
         return self
 
@@ -464,6 +474,86 @@ class SetAttribute(BaseTaskBase):
         return self.ih.read(*args, **kwargs)
 
 
+class TimeSlice(BaseTaskBase):
+    """Wrapper for streams that selects a range in time.
+
+    Useful to process only part of a long stream, since tasks set up on
+    top of the slice will only take into account the samples inside it.
+
+    Like `~scintillometry.base.SetAttribute`, the class reads directly from
+    the underlying stream, so it does not copy data and has very little
+    performance impact.  The ``shape`` is exactly ``stop - start`` samples,
+    and the ``start_time`` is that of the first sample included.  Like for
+    other tasks, the number of samples has to be a multiple of
+    ``samples_per_frame``.
+
+    Parameters
+    ----------
+    ih : stream handle
+        Handle of a stream reader or another task.
+    start : int, `~astropy.units.Quantity`, or `~astropy.time.Time`, optional
+        Start of the slice, as an offset in samples or time relative to the
+        start of the underlying stream, or as an absolute time.  Times are
+        rounded to the nearest sample.  Default: start of the stream.
+    stop : int, `~astropy.units.Quantity`, or `~astropy.time.Time`, optional
+        End of the slice (exclusive), in the same form as ``start``.
+        Default: end of the stream.
+    samples_per_frame : int, optional
+        Number of samples that tasks operating on the slice would by default
+        process in one go.  Should divide the number of samples in the slice.
+        Default: the largest number that does so and is not larger than the
+        samples per frame of the underlying stream.
+
+    """
+    def __init__(self, ih, start=None, stop=None, *, samples_per_frame=None):
+        offset0 = ih.tell()
+        start = 0 if start is None else ih.seek(start)
+        stop = ih.shape[0] if stop is None else ih.seek(stop)
+        ih.seek(offset0)
+        if not 0 <= start < stop <= ih.shape[0]:
+            raise ValueError("slice should be non-empty and inside the "
+                             "underlying stream.")
+
+        n_sample = stop - start
+        if samples_per_frame is None:
+            divisors = np.arange(1, min(ih.samples_per_frame, n_sample) + 1)
+            samples_per_frame = divisors[n_sample % divisors == 0][-1]
+        elif n_sample % samples_per_frame:
+            raise ValueError("samples per frame should divide the number "
+                             "of samples in the slice.")
+
+        super().__init__(ih, shape=(n_sample,) + ih.sample_shape,
+                         start_time=ih.start_time + start / ih.sample_rate,
+                         samples_per_frame=int(samples_per_frame))
+        self._start = start
+
+    def read(self, count=None, out=None):
+        """Read a number of complete samples from the underlying stream.
+
+        Parameters
+        ----------
+        count : int or None, optional
+            Number of complete samples to read.  If `None` (default) or
+            negative, the whole remainder of the slice is read.  Ignored if
+            ``out`` is given.
+        out : None or array, optional
+            Array to store the output in. If given, ``count`` will be inferred
+            from the first dimension; the other dimension should equal
+            `sample_shape`.
+
+        Returns
+        -------
+        out : `~numpy.ndarray` of float or complex
+            The first dimension is sample-time, and the remainder given by
+            `sample_shape`.
+        """
+        out = self._get_read_output(count, out)
+        self.ih.seek(self._start + self.offset)
+        self.ih.read(out=out)
+        self.offset += out.shape[0]
+        return out
+
+
 class TaskBase(BaseTaskBase):
     """Base class of all tasks.
 
@@ -1,14 +1,18 @@
 # Licensed under the GPLv3 - see LICENSE
 
+import math
 import operator
 
 import numpy as np
+from astropy.utils import lazyproperty
 
-from .base import TaskBase
+from .base import TaskBase, BaseTaskBase
 from .fourier import get_fft_maker
+from .functions import power_polarization
 
 
-__all__ = ['Channelize', 'Dechannelize']
+__all__ = ['Channelize', 'Dechannelize', 'ZoomChannelize', 'Spectrometer',
+           'PolyphaseChannelize', 'PolyphaseDechannelize']
 
 
 class Channelize(TaskBase):
@@ -166,3 +170,643 @@ class Dechannelize(TaskBase):
         """
         # TODO: would be nicer to somehow use _fft.inverse().
         return Channelize(ih, n=self._ifft.time_shape[1], FFT=self._FFT)
+
+
+class ZoomChannelize(TaskBase):
+    """Channelizer that calculates only a contiguous range of channels.
+
+    Gives the same result as ``Channelize(ih, n)`` followed by selecting
+    channels ``start`` up to ``stop``, but without calculating all others.
+    For this purpose, blocks of ``n`` samples are decimated into ``n // q``
+    interleaved sequences of length ``q``, where ``q`` is the smallest divisor
+    of ``n`` that is not smaller than the number of channels requested.  Each
+    sequence is Fourier transformed, and the requested channels found by
+    phase rotating and summing the relevant frequencies of the transforms.
+    Thus, the cost scales as ``n log(q)`` rather than ``n log(n)``.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    n : int
+        Number of input samples to channelize.
+    start, stop : int
+        Range of channels to calculate, using the numbering of the output of
+        `~scintillometry.channelize.Channelize`.  For complex data, channel
+        numbers are taken modulo ``n``, so that, e.g., ``start=-2, stop=2``
+        gives the four channels around zero frequency.  For real data, one
+        should have ``0 <= start < stop <= n // 2 + 1``.
+    samples_per_frame : int, optional
+        Number of complete output samples per frame.  Default: 1.
+    frequency : `~astropy.units.Quantity`, optional
+        Frequencies for each channel in ``ih`` (channelized frequencies will
+        be calculated).  Default: taken from ``ih`` (if available).
+    sideband : array, optional
+        Whether frequencies in ``ih`` are upper (+1) or lower (-1) sideband.
+        Default: taken from ``ih`` (if available).
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the channelizer uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+
+    See Also
+    --------
+    Channelize : to calculate all channels
+    """
+
+    def __init__(self, ih, n, start, stop, samples_per_frame=1,
+                 frequency=None, sideband=None, FFT=None):
+        n = operator.index(n)
+        start = operator.index(start)
+        stop = operator.index(stop)
+        samples_per_frame = operator.index(samples_per_frame)
+        if ih.complex_data:
+            if not 0 < stop - start <= n:
+                raise ValueError("need 0 < stop - start <= n for complex "
+                                 "data.")
+            channel_frequency = np.fft.fftfreq(n, d=(1. / ih.sample_rate))
+        else:
+            if not 0 <= start < stop <= n // 2 + 1:
+                raise ValueError("need 0 <= start < stop <= n // 2 + 1 for "
+                                 "real data.")
+            channel_frequency = np.fft.rfftfreq(n, d=(1. / ih.sample_rate))
+
+        channels = np.arange(start, stop) % n
+        n_channel = len(channels)
+        q = min(i for i in range(n_channel, n + 1) if n % i == 0)
+        p = n // q
+        dtype = np.result_type(ih.dtype, np.complex64)
+        self._FFT = get_fft_maker(FFT)
+        self._fft = self._FFT((samples_per_frame, q, p) + ih.sample_shape,
+                              dtype, axis=1)
+        # The frequencies needed from the short transforms form a contiguous
+        # range, possibly wrapping around.  Store the slices of the output and
+        # of the transforms, and the corresponding phase factors, for the one
+        # or two pieces, so that no fancy indexing (i.e., copying) is needed.
+        phase_factor = np.exp(
+            -2j * np.pi / n * np.outer(channels, np.arange(p))).astype(dtype)
+        first = channels[0] % q
+        split = min(q - first, n_channel)
+        self._pieces = [(slice(0, split), slice(first, first + split),
+                         phase_factor[:split])]
+        if split < n_channel:
+            self._pieces.append((slice(split, None),
+                                 slice(0, n_channel - split),
+                                 phase_factor[split:]))
+
+        nsample = (ih.shape[0] // (n * samples_per_frame) *
+                   samples_per_frame)
+        super().__init__(ih, shape=(nsample, n_channel) + ih.sample_shape,
+                         sample_rate=ih.sample_rate / n,
+                         samples_per_frame=samples_per_frame,
+                         frequency=frequency, sideband=sideband,
+                         dtype=dtype)
+
+        if self._frequency is not None:
+            channel_frequency = channel_frequency[channels].reshape(
+                (-1,) + (1,) * len(ih.sample_shape))
+            # Do not use in-place, since _frequency is likely broadcast.
+            self._frequency = (self._frequency +
+                               channel_frequency * self.sideband)
+
+    def task(self, data):
+        ft = self._fft(data.reshape(self._fft.time_shape).astype(
+            self.dtype, copy=False))
+        result = np.empty((ft.shape[0],) + self.sample_shape, self.dtype)
+        for out, selection, phase_factor in self._pieces:
+            np.einsum('kp,tkp...->tk...', phase_factor, ft[:, selection],
+                      out=result[:, out])
+        return result
+
+
+class Spectrometer(TaskBase):
+    """Channelize, detect and integrate in one go.
+
+    Produces the same output as ``Integrate(Square(Channelize(ih, n)),
+    step)``, or, with ``cross=True``, as ``Integrate(Power(Channelize(ih, n)),
+    step)``, but without creating the intermediate channelized and detected
+    frames: powers are summed directly from the Fourier transform output.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    n : int
+        Number of input samples to channelize.  For complex input, output will
+        have ``n`` channels; for real input, it will have ``n // 2 + 1``.
+    step : int, optional
+        Number of spectra to integrate over.  Default: 1.
+    cross : bool, optional
+        Whether to calculate the cross terms between two polarizations as
+        well, as in `~scintillometry.functions.Power`.  Default: `False`.
+    average : bool, optional
+        Whether to average the spectra (default) or just sum them.
+    samples_per_frame : int, optional
+        Number of complete output samples per frame.  Default: 1.
+    frequency : `~astropy.units.Quantity`, optional
+        Frequencies for each channel in ``ih`` (channelized frequencies will
+        be calculated).  Default: taken from ``ih`` (if available).
+    sideband : array, optional
+        Whether frequencies in ``ih`` are upper (+1) or lower (-1) sideband.
+        Default: taken from ``ih`` (if available).
+    polarization : array or (nested) list of char, optional
+        Polarization labels.  Should broadcast to the sample shape of ``ih``.
+        Output labels will be doubled, as in `~scintillometry.functions.Square`
+        or `~scintillometry.functions.Power`.  Default: taken from ``ih``
+        (required if ``cross=True``).
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the channelizer uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+
+    Raises
+    ------
+    AttributeError
+        If ``cross=True`` and no polarization information is given.
+    ValueError
+        If ``cross=True`` and the number of polarizations is not equal to two,
+        or the polarization labels are not unique.
+    """
+
+    def __init__(self, ih, n, step=1, *, cross=False, average=True,
+                 samples_per_frame=1, frequency=None, sideband=None,
+                 polarization=None, FFT=None):
+        n = operator.index(n)
+        step = operator.index(step)
+        samples_per_frame = operator.index(samples_per_frame)
+        self._FFT = get_fft_maker(FFT)
+        self._fft = self._FFT((samples_per_frame * step, n) + ih.sample_shape,
+                              ih.dtype, axis=1, sample_rate=ih.sample_rate)
+        sample_shape = self._fft.frequency_shape[1:]
+
+        if polarization is None:
+            polarization = getattr(ih, 'polarization', None)
+        if cross:
+            if polarization is None:
+                raise AttributeError("need polarization information to "
+                                     "calculate cross terms.")
+            polarization, pol_axis = power_polarization(polarization,
+                                                        ih.sample_shape)
+            self._axis = len(sample_shape) + pol_axis
+            sample_shape = (sample_shape[:self._axis] + (4,) +
+                            sample_shape[self._axis+1:])
+        elif polarization is not None:
+            polarization = np.core.defchararray.add(polarization,
+                                                    polarization)
+
+        self._step = step
+        self.cross = cross
+        self.average = average
+        nsample = (ih.shape[0] // (n * step * samples_per_frame) *
+                   samples_per_frame)
+        super().__init__(ih, shape=(nsample,) + sample_shape,
+                         sample_rate=ih.sample_rate / (n * step),
+                         samples_per_frame=samples_per_frame,
+                         frequency=frequency, sideband=sideband,
+                         polarization=polarization,
+                         dtype=np.zeros(1, self._fft.frequency_dtype).real.dtype)
+
+        if self._frequency is not None:
+            # Do not use in-place, since _frequency is likely broadcast.
+            self._frequency = (self._frequency +
+                               self._fft.frequency * self.sideband)
+
+    def task(self, data):
+        ft = self._fft(data.reshape(self._fft.time_shape))
+        # Group the spectra per output sample, and work with views of the
+        # real and imaginary parts, so that the sums of products can be done
+        # by einsum without creating any (complex) temporaries.
+        ft = ft.reshape((self.samples_per_frame, self._step) + ft.shape[1:])
+        if not self.cross:
+            re, im = ft.real, ft.imag
+            result = np.einsum('ts...,ts...->t...', re, re)
+            result += np.einsum('ts...,ts...->t...', im, im)
+        else:
+            result = np.empty((self.samples_per_frame,) + self.sample_shape,
+                              self.dtype)
+            # Get views in which the axis with the polarization is second.
+            in_ = ft.swapaxes(2, self._axis + 2)
+            out = result.swapaxes(1, self._axis + 1)
+            xr, xi = in_[:, :, 0].real, in_[:, :, 0].imag
+            yr, yi = in_[:, :, 1].real, in_[:, :, 1].imag
+            for i, (a, b, c, d, sign) in enumerate((
+                    (xr, xr, xi, xi, 1), (yr, yr, yi, yi, 1),
+                    (xr, yr, xi, yi, 1), (xi, yr, xr, yi, -1))):
+                np.einsum('ts...,ts...->t...', a, b, out=out[:, i])
+                if sign > 0:
+                    out[:, i] += np.einsum('ts...,ts...->t...', c, d)
+                else:
+                    out[:, i] -= np.einsum('ts...,ts...->t...', c, d)
+
+        if self.average:
+            result /= self._step
+        return result
+
+
+def prototype_filter(n, n_tap, window=np.hanning, width=None, dtype='f8'):
+    """Windowed-sinc prototype filter for polyphase filterbanks.
+
+    Parameters
+    ----------
+    n : int
+        Number of channels, i.e., the length of each tap.
+    n_tap : int
+        Number of taps.
+    window : callable or array, optional
+        If callable, it is called with the filter length ``n * n_tap`` and
+        should return a window by which a sinc is multiplied.  Otherwise,
+        taken to be the complete prototype filter, which should have length
+        ``n * n_tap``.  Default: `~numpy.hanning`.
+    width : int, optional
+        Number of samples in each lobe of the sinc.  Default: ``n``, i.e.,
+        a low-pass filter for a single channel.
+    dtype : `~numpy.dtype`, optional
+        Output dtype.  Default: float64.
+
+    Returns
+    -------
+    prototype : `~numpy.ndarray`
+        Filter with shape ``(n_tap, n)``.  For a callable ``window``, it is
+        normalized such that its sum is ``width``, so that for the default,
+        the gain for a constant signal is the same as that of a plain Fourier
+        transform.
+    """
+    n_raw = n * n_tap
+    if callable(window):
+        if width is None:
+            width = n
+        x = (np.arange(n_raw) - (n_raw - 1) / 2) / width
+        prototype = np.sinc(x) * window(n_raw)
+        prototype *= width / prototype.sum()
+    else:
+        prototype = np.asanyarray(window)
+        if prototype.shape != (n_raw,):
+            raise ValueError("prototype filter should have length n * n_tap "
+                             "= {}.".format(n_raw))
+
+    return prototype.reshape(n_tap, n).astype(dtype, copy=False)
+
+
+def phase_rotation(n, step, n_frequency, dtype):
+    """Phase factors that align spectra taken at non-multiples of ``n``.
+
+    For spectrum ``m`` of an oversampled filterbank, the input is offset by
+    ``(m * step) % n`` samples relative to the Fourier transform's time
+    origin.  The factors repeat with period ``n / gcd(n, step)``, so only one
+    period is calculated.
+
+    Returns
+    -------
+    factor : `~numpy.ndarray` or None
+        With shape ``(period, n_frequency)``.  `None` if no rotation is
+        needed, i.e., if ``step`` is a multiple of ``n``.
+    """
+    period = n // math.gcd(n, step)
+    if period == 1:
+        return None
+    shift = (np.arange(period) * step) % n
+    k = np.arange(n_frequency)
+    return np.exp((-2j * np.pi / n) * shift[:, np.newaxis] * k).astype(
+        dtype, copy=False)
+
+
+class PolyphaseChannelize(BaseTaskBase):
+    """Polyphase filterbank channelizer.
+
+    Like `~scintillometry.channelize.Channelize`, but instead of Fourier
+    transforming independent blocks of ``n`` samples, sums ``n_tap``
+    consecutive blocks weighted by a windowed-sinc prototype filter before
+    the transform.  This gives channels with much flatter response and far
+    less leakage between them.  The output sample shape is ``(channel,) +
+    ih.sample_shape``.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    n : int
+        Number of input samples per tap.  For complex input, output will have
+        ``n`` channels; for real input, it will have ``n // 2 + 1``.
+    n_tap : int, optional
+        Number of taps of the prototype filter.  Default: 4.
+    step : int, optional
+        Number of input samples between consecutive spectra.  Default: ``n``,
+        i.e., critically sampled.  For smaller values, the output is
+        oversampled by a factor ``n / step``.
+    window : callable or array, optional
+        Window applied to the sinc prototype filter, or the complete
+        prototype filter, of length ``n * n_tap``.  Default: `~numpy.hanning`.
+        See `~scintillometry.channelize.prototype_filter`.
+    samples_per_frame : int, optional
+        Number of complete output samples per frame.  Default: 1.
+    frequency : `~astropy.units.Quantity`, optional
+        Frequencies for each channel in ``ih`` (channelized frequencies will
+        be calculated).  Default: taken from ``ih`` (if available).
+    sideband : array, optional
+        Whether frequencies in ``ih`` are upper (+1) or lower (-1) sideband.
+        Default: taken from ``ih`` (if available).
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the channelizer uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+
+    Notes
+    -----
+    Each output spectrum uses ``n * n_tap`` input samples, and its time is
+    taken to be that of the central block of ``n`` samples, i.e., the start
+    time is later than that of the underlying stream by ``(n_tap - 1) * n / 2``
+    samples.  Consecutive frames overlap in their input, but all taps are
+    read in one go, so no state is kept between frames.
+
+    For oversampled output, spectra are phase-rotated such that each channel
+    is a continuous time stream, as it would be for a bank of mixers and
+    low-pass filters.
+
+    See Also
+    --------
+    PolyphaseDechannelize : to approximately invert the channelization
+    """
+
+    def __init__(self, ih, n, n_tap=4, step=None, window=np.hanning,
+                 samples_per_frame=1, frequency=None, sideband=None,
+                 FFT=None):
+        n = operator.index(n)
+        n_tap = operator.index(n_tap)
+        step = n if step is None else operator.index(step)
+        if not 0 < step <= n:
+            raise ValueError("step should be positive and at most n.")
+        samples_per_frame = operator.index(samples_per_frame)
+
+        # Initialize channelizer.
+        self._FFT = get_fft_maker(FFT)
+        self._fft = self._FFT((samples_per_frame, n) + ih.sample_shape,
+                              ih.dtype, axis=1, sample_rate=ih.sample_rate)
+        real_dtype = np.zeros(1, ih.dtype).real.dtype
+        prototype = prototype_filter(n, n_tap, window, dtype=real_dtype)
+        self._prototype = prototype.reshape(prototype.shape +
+                                            (1,) * len(ih.sample_shape))
+        self._window = window
+        self._n = n
+        self._n_tap = n_tap
+        self._step = step
+
+        n_raw = n * n_tap
+        shape = ((ih.shape[0] - n_raw) // step + 1,) + self._fft.frequency_shape[1:]
+        super().__init__(ih, shape=shape, sample_rate=ih.sample_rate / step,
+                         samples_per_frame=samples_per_frame,
+                         frequency=frequency, sideband=sideband,
+                         dtype=self._fft.frequency_dtype)
+        self._start_time += (n_raw - n) / 2 / ih.sample_rate
+
+        if self._frequency is not None:
+            # Do not use in-place, since _frequency is likely broadcast.
+            self._frequency = (self._frequency +
+                               self._fft.frequency * self.sideband)
+
+    @lazyproperty
+    def _phase_factor(self):
+        factor = phase_rotation(self._n, self._step,
+                                self._fft.frequency_shape[1], self.dtype)
+        if factor is not None:
+            factor.shape += (1,) * (self.ndim - 2)
+        return factor
+
+    def _read_frame(self, frame_index):
+        # Read all samples needed for the frame, including the tap history.
+        self.ih.seek(frame_index * self.samples_per_frame * self._step)
+        data = self.ih.read((self.samples_per_frame - 1) * self._step +
+                            self._n * self._n_tap)
+        # View data as (spectrum, tap, sample-in-tap, sample_shape), and
+        # sum over taps, weighting with the prototype filter.
+        taps = np.lib.stride_tricks.as_strided(
+            data, shape=((self.samples_per_frame, self._n_tap, self._n) +
+                         data.shape[1:]),
+            strides=((data.strides[0] * self._step,
+                      data.strides[0] * self._n) + data.strides),
+            writeable=False)
+        folded = taps[:, 0] * self._prototype[0]
+        for tap in range(1, self._n_tap):
+            folded += taps[:, tap] * self._prototype[tap]
+
+        ft = self._fft(folded)
+        if self._phase_factor is not None:
+            spectra = (frame_index * self.samples_per_frame +
+                       np.arange(self.samples_per_frame))
+            ft *= self._phase_factor[spectra % len(self._phase_factor)]
+        return ft
+
+    def inverse(self, ih):
+        """Create a PolyphaseDechannelize instance that undoes this one.
+
+        Parameters
+        ----------
+        ih : task or `baseband` stream reader
+            Input data stream to be dechannelized.
+        """
+        return PolyphaseDechannelize(ih, n_tap=self._n_tap, step=self._step,
+                                     window=self._window,
+                                     n=self._n, dtype=self._fft.time_dtype,
+                                     FFT=self._FFT)
+
+    def close(self):
+        super().close()
+        # Clear the caches of the lazyproperties to release memory.
+        del self._phase_factor
+
+
+class PolyphaseDechannelize(BaseTaskBase):
+    """Polyphase filterbank synthesizer.
+
+    Inverse Fourier transforms spectra on the first sample axis (which gets
+    removed), and overlap-adds the results weighted by a synthesis filter.
+    For a callable ``window``, this is a windowed sinc with ``step`` samples
+    per lobe, i.e., a filter that interpolates the spectra back to the full
+    sample rate.  The output is normalized such that a stream produced by
+    `~scintillometry.channelize.PolyphaseChannelize` with the same parameters
+    is reconstructed, with unity gain at the channel centres.
+
+    The reconstruction is exact if the prototype filter is no longer than
+    ``n`` (e.g., ``n_tap=1``, which gives a windowed short-time Fourier
+    transform), good to about a percent if oversampled by a factor two,
+    and poor near the channel edges if critically sampled, since then the
+    channels are aliased.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis, and Fourier channel
+        as the second.
+    n_tap : int, optional
+        Number of taps of the prototype filter.  Default: 4.
+    step : int, optional
+        Number of output samples between consecutive spectra.  Default: ``n``.
+    window : callable or array, optional
+        Window applied to the sinc prototype filter, or the complete
+        prototype filter, of length ``n * n_tap``.  In the latter case,
+        the same filter is used for synthesis.  Default: `~numpy.hanning`.
+    n : int, optional
+        Number of output samples per tap.  By default, for complex output
+        data, the same as the number of channels.  For real output data,
+        the number has to be passed in.
+    samples_per_frame : int, optional
+        Number of complete output samples per frame.  Should be a multiple
+        of ``step``.  Default: such that at least 75% of the spectra read
+        for each frame are not just needed for overlap.
+    frequency : `~astropy.units.Quantity`, optional
+        Frequencies for each output channel.  Default: inferred from ``ih``
+        (if available).
+    sideband : array, optional
+        Whether frequencies are upper (+1) or lower (-1) sideband.
+        Default: taken from ``ih`` (if available).
+    dtype : `~numpy.dtype`, optional
+        Output dtype.  Default: that of ``ih``.
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the channelizer uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+
+    See Also
+    --------
+    PolyphaseChannelize : the corresponding analysis filterbank
+    """
+
+    def __init__(self, ih, n_tap=4, step=None, window=np.hanning, n=None,
+                 samples_per_frame=None, frequency=None, sideband=None,
+                 dtype=None, FFT=None):
+
+        assert ih.complex_data, "Dechannelization needs complex spectra."
+
+        if dtype is None:
+            dtype = ih.dtype  # this keeps it complex by default.
+        dtype = np.dtype(dtype)
+
+        if n is None:
+            if dtype.kind == 'c':
+                n = ih.sample_shape[0]
+            else:
+                raise ValueError("Need to pass in explicit n for real transform.")
+        else:
+            n = operator.index(n)
+        n_tap = operator.index(n_tap)
+        step = n if step is None else operator.index(step)
+        if not 0 < step <= n:
+            raise ValueError("step should be positive and at most n.")
+
+        # Number of spectra that contribute to any given output sample;
+        # all but one of these are needed as overlap for each frame.
+        n_raw = n * n_tap
+        n_overlap = -(-n_raw // step)
+        pad = n_overlap - 1
+        if samples_per_frame is None:
+            n_block = ih.samples_per_frame
+            if pad > 0:
+                n_block = max(n_block,
+                              2 ** (int(np.ceil(np.log2(pad))) + 2) - pad)
+        else:
+            n_block, r = divmod(operator.index(samples_per_frame), step)
+            if r != 0:
+                raise ValueError("samples_per_frame should be a multiple "
+                                 "of step.")
+
+        # Initialize dechannelizer.
+        self._FFT = get_fft_maker(FFT)
+        self._ifft = self._FFT((n_block + pad, n) + ih.sample_shape[1:],
+                               dtype=dtype, axis=1, direction='backward')
+        real_dtype = np.zeros(1, dtype).real.dtype
+        self._prototype = prototype_filter(n, n_tap, window,
+                                           dtype=real_dtype)
+        if callable(window):
+            # Synthesis filter that interpolates the spectra to full rate.
+            self._synthesis_filter = prototype_filter(
+                n, n_tap, window, width=step, dtype=real_dtype).ravel()
+        else:
+            self._synthesis_filter = self._prototype.ravel()
+        self._window = window
+        self._n = n
+        self._n_tap = n_tap
+        self._step = step
+        self._pad = pad
+
+        sample_rate = ih.sample_rate * step
+        if frequency is None and hasattr(ih, 'frequency'):
+            frequency = ih.frequency[0]
+
+        super().__init__(ih, shape=((ih.shape[0] - pad) * step,) + ih.shape[2:],
+                         sample_rate=sample_rate,
+                         samples_per_frame=n_block * step,
+                         frequency=frequency, sideband=sideband,
+                         dtype=self._ifft.time_dtype)
+        self._start_time += (pad * step - (n_raw - n) / 2) / sample_rate
+        self._setup_synthesis()
+
+    @lazyproperty
+    def _phase_factor(self):
+        factor = phase_rotation(self._n, self._step,
+                                self.ih.sample_shape[0], self.ih.dtype)
+        if factor is not None:
+            factor = factor.conj()
+            factor.shape += (1,) * (self.ih.ndim - 2)
+        return factor
+
+    def _setup_synthesis(self):
+        """Indices and prototype weights for each step-sized segment.
+
+        Also calculates the normalization, which is the gain for signals
+        at the channel centres, for which all analysis taps add coherently.
+        """
+        sample_shape_ones = (1,) * (self.ndim - 1)
+        n_raw = self._synthesis_filter.size
+        tap_sum = self._prototype.sum(0)
+        segments = []
+        norm = np.zeros(self._step)
+        for start in range(0, self._pad * self._step + 1, self._step):
+            raw = start + np.arange(self._step)
+            weight = np.where(raw < n_raw,
+                              self._synthesis_filter[np.minimum(raw, n_raw-1)],
+                              0)
+            norm += weight * tap_sum[raw % self._n]
+            first = start % self._n
+            if first + self._step <= self._n:
+                index = slice(first, first + self._step)
+            else:
+                index = raw % self._n
+            segments.append((index, weight.reshape((-1,) + sample_shape_ones)))
+
+        if np.any(norm == 0):
+            raise ValueError("prototype filter cannot be inverted for this "
+                             "step; try a smaller one.")
+        inverse_norm = (1. / norm).astype(self._synthesis_filter.dtype)
+        self._segments = segments
+        self._inverse_norm = inverse_norm.reshape((-1,) + sample_shape_ones)
+
+    def _read_frame(self, frame_index):
+        n_block = self.samples_per_frame // self._step
+        self.ih.seek(frame_index * n_block)
+        data = self.ih.read(n_block + self._pad)
+        if self._phase_factor is not None:
+            spectra = frame_index * n_block + np.arange(n_block + self._pad)
+            data *= self._phase_factor[spectra % len(self._phase_factor)]
+        folded = self._ifft(data)
+        # Overlap-add: output block i gets segment u of spectrum i + pad - u.
+        out = np.zeros((n_block, self._step) + self.sample_shape, self.dtype)
+        for u, (index, weight) in enumerate(self._segments):
+            out += folded[self._pad - u:self._pad - u + n_block, index] * weight
+        out *= self._inverse_norm
+        return out.reshape((-1,) + self.sample_shape)
+
+    def inverse(self, ih):
+        """Create a PolyphaseChannelize instance that undoes this one.
+
+        Parameters
+        ----------
+        ih : task or `baseband` stream reader
+            Input data stream to be channelized.
+        """
+        return PolyphaseChannelize(ih, n=self._n, n_tap=self._n_tap,
+                                   step=self._step, window=self._window,
+                                   FFT=self._FFT)
+
+    def close(self):
+        super().close()
+        # Clear the caches of the lazyproperties to release memory.
+        del self._phase_factor
@@ -1,13 +1,18 @@
 """Module for signal-processing of baseband signals."""
 
+import operator
+
 import numpy as np
-from .base import TaskBase
+import astropy.units as u
+
+from .base import BaseTaskBase, PaddedTaskBase
+from .channelize import prototype_filter
 from .fourier import get_fft_maker
 
-__all__ = ['Real2Complex']
+__all__ = ['Real2Complex', 'DownConvert']
 
 
-class Real2Complex(TaskBase):
+class Real2Complex(BaseTaskBase):
     """
     Convert a real baseband signal to a complex baseband signal.
 
@@ -23,29 +28,45 @@ class Real2Complex(TaskBase):
     ih : task or `baseband` stream reader
         Input data stream, with time as the first axis.
     samples_per_frame : int, optional
-        Number of complete output samples per frame (see Notes).  Default: 1.
+        Number of complete output samples per frame (see Notes).  Default:
+        half the number of samples per frame of the underlying stream.
     FFT : FFT maker or None, optional
         FFT maker.  Default: `None`, in which case the channelizer uses the
         default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
         available, otherwise numpy).
+    overlap : int, optional
+        Number of input samples to use as padding on either side of each
+        frame, to reduce artifacts at the frame edges.  Should be even.
+        The output stream will start and end ``overlap`` input samples
+        later and earlier than the underlying stream.  Default: 0.
 
     Raises
     ------
     ValueError
-        If ``ih`` has complex data.
+        If ``ih`` has complex data, or ``overlap`` is negative or odd.
 
     Notes
     -----
     This function assumes the input signal is a causal signal.
 
+    The calculation is done using a real-input FFT over each frame,
+    followed by an inverse FFT of half the length, which directly gives
+    the decimated analytic signal.  Since the Hilbert transform is done frame
+    by frame, samples near the frame edges are affected by the wrap-around
+    of the signal.  This can be reduced by passing in a non-zero
+    ``overlap``.
+
     References
     ----------
     .. https://dsp.stackexchange.com/q/43278/17721
     """
 
-    def __init__(self, ih, samples_per_frame=None, FFT=None):
+    def __init__(self, ih, samples_per_frame=None, FFT=None, *, overlap=0):
         if ih.complex_data:
             raise ValueError("Stream should be real.")
+        overlap = operator.index(overlap)
+        if overlap < 0 or overlap % 2:
+            raise ValueError("overlap should be even and non-negative.")
 
         if samples_per_frame is None:
             assert ih.samples_per_frame % 2 == 0, \
@@ -53,14 +74,27 @@ class Real2Complex(TaskBase):
             samples_per_frame = ih.samples_per_frame // 2
 
         dtype = np.dtype('c{}'.format(ih.dtype.itemsize * 2))
+        real_dtype = np.zeros(1, dtype).real.dtype
+        # Number of output samples calculated per frame, including padding.
+        n_pad = overlap // 2
+        n_frame = samples_per_frame + 2 * n_pad
         self._FFT = get_fft_maker(FFT)
-        self._fft = self._FFT((samples_per_frame * 2, ) + ih.sample_shape,
-                              dtype,
-                              sample_rate=ih.sample_rate,
-                              axis=0)
-
-        self._ifft = self._fft.inverse()
-        super().__init__(ih,
+        self._fft = self._FFT((n_frame * 2,) + ih.sample_shape, real_dtype,
+                              sample_rate=ih.sample_rate, axis=0)
+        self._ifft = self._FFT((n_frame,) + ih.sample_shape, dtype,
+                               direction='backward',
+                               sample_rate=ih.sample_rate / 2, axis=0)
+        # The frequency shift by -B/2 is multiplication by (-1)**n, where n
+        # is the output sample index.
+        self._shift = np.ones((n_frame,) + (1,) * len(ih.sample_shape),
+                              real_dtype)
+        self._shift[1::2] = -1
+        self._n_pad = n_pad
+        self._n_frame = n_frame
+
+        super().__init__(ih, shape=((ih.shape[0] - 2 * overlap) // 2,) +
+                         ih.sample_shape,
+                         start_time=ih.start_time + overlap / ih.sample_rate,
                          samples_per_frame=samples_per_frame,
                          sample_rate=ih.sample_rate / 2,
                          dtype=dtype)
@@ -70,24 +104,150 @@ class Real2Complex(TaskBase):
                                ih.sample_rate / 2 * self.sideband)
 
     def task(self, data):
-        z = data.astype(self.dtype)
-        N = z.shape[0]
-
-        # Hilbert transform
-        z = self._fft(z)
-
-        h = np.zeros(N)
-        if N % 2 == 0:
-            h[0] = h[N // 2] = 1
-            h[1:N // 2] = 2
-        else:
-            h[0] = 1
-            h[1:(N + 1) // 2] = 2
-        z = self._ifft(z * h)
-
-        # Frequency shift signal by -B/2
-        h = np.exp(-1j * np.pi / 2 * np.arange(N))
-        z *= h
-
-        z = z[::2]
+        """Convert a frame of real samples to complex baseband.
+
+        The frame should include any padding, i.e., have ``2 * overlap``
+        samples more than twice the number of samples per frame, and is
+        assumed to start at an even output sample.  The result includes
+        ``overlap // 2`` padding samples on either side.
+        """
+        # For N=2M real samples with real-input FFT X, the analytic signal
+        # has Z[0]=X[0], Z[k]=2X[k] for 0<k<M, Z[M]=X[M] and zero otherwise.
+        # Its every other sample equals the M-point inverse FFT of X[:M],
+        # with X[0] replaced by (X[0] + X[M]) / 2 (as X[M] aliases to 0).
+        ft = self._fft(data.astype(self._fft.time_dtype, copy=False))
+        ft[0] += ft[self._n_frame]
+        ft[0] *= 0.5
+        z = self._ifft(ft[:self._n_frame])
+        # Frequency shift signal by -B/2.
+        z *= self._shift
         return z
+
+    def _read_frame(self, frame_index):
+        # Read the frame including padding (which starts at the frame
+        # offset in the underlying stream, since our output starts later).
+        self.ih.seek(2 * frame_index * self.samples_per_frame)
+        data = self.ih.read(2 * self._n_frame)
+        z = self.task(data)
+        # The shift in task assumes an even start; flip the sign if the
+        # output sample index at the start of the frame is odd.
+        if (frame_index * self.samples_per_frame - self._n_pad) % 2:
+            z = -z
+        return z[self._n_pad:self._n_pad + self.samples_per_frame]
+
+
+class DownConvert(PaddedTaskBase):
+    """Digital down-conversion of a sub-band to lower sample rate.
+
+    The signal is mixed with a numerically controlled oscillator such that
+    the frequency ``mix_frequency`` in the underlying stream is shifted to
+    zero, then low-pass filtered with a windowed-sinc FIR filter, and
+    decimated by an integer factor.  The filter is applied in polyphase
+    form, i.e., only for the samples that are kept, so that the cost of the
+    filtering is proportional to the output rate.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.  Can be real or
+        complex.
+    mix_frequency : `~astropy.units.Quantity`
+        Frequency in the underlying signal, i.e., relative to its
+        ``frequency`` (if present), that should become the center of the
+        output band.
+    decimation : int
+        Factor by which to reduce the sample rate.  The output band has
+        width ``ih.sample_rate / decimation``.
+    n_tap : int, optional
+        Number of taps per polyphase branch, i.e., the FIR filter has length
+        ``n_tap * decimation``.  Default: 16.
+    window : callable or array, optional
+        Window applied to the sinc low-pass filter, or the complete
+        filter.  Default: `~numpy.hanning`.  See
+        `~scintillometry.channelize.prototype_filter`.
+    offset : int, optional
+        Where samples should be considered to be taken from, relative to the
+        end of the filter.  Default: the center of the filter.
+    samples_per_frame : int, optional
+        Number of output samples which should be produced in one go.
+        If not given, such that at least 75% of the input read is used.
+
+    Notes
+    -----
+    The oscillator is precomputed for one frame, and only multiplied by
+    a phase factor for a given frame.  Since mixing is a linear operation,
+    that factor is applied to the filtered, decimated output.
+
+    If the underlying stream has a ``frequency`` attribute, the output
+    frequency will be shifted by ``mix_frequency``, taking into account
+    ``sideband``.  For real input, the output has a complex dtype.
+    """
+
+    def __init__(self, ih, mix_frequency, decimation, n_tap=16,
+                 window=np.hanning, offset=None, samples_per_frame=None):
+        decimation = operator.index(decimation)
+        n_tap = operator.index(n_tap)
+        if decimation < 1 or n_tap < 1:
+            raise ValueError("decimation and n_tap should be positive.")
+        n_filter = n_tap * decimation
+        if offset is None:
+            offset = (n_filter - 1) // 2
+        pad = n_filter - 1
+        if samples_per_frame is None:
+            # Use 4 times the power of two above the padding, as in
+            # PaddedTaskBase, but in units of output samples.
+            samples_per_frame = max(
+                2 ** (int(np.ceil(np.log2(max(pad, 1)))) + 2) // decimation, 1)
+
+        dtype = np.dtype(ih.dtype)
+        if dtype.kind != 'c':
+            dtype = np.dtype('c{}'.format(dtype.itemsize * 2))
+        real_dtype = np.zeros(1, dtype).real.dtype
+        super().__init__(ih, pad_start=pad-offset, pad_end=offset,
+                         samples_per_frame=(samples_per_frame * decimation +
+                                            pad),
+                         sample_rate=ih.sample_rate / decimation,
+                         dtype=dtype)
+        # PaddedTaskBase works in units of input samples; convert to output.
+        self._shape = ((self._shape[0] // decimation,) + self.sample_shape)
+        self._samples_per_frame = samples_per_frame
+        # Low-pass filter with unit gain, in polyphase form.
+        self._filter = prototype_filter(decimation, n_tap, window,
+                                        dtype=real_dtype) / decimation
+        self._decimation = decimation
+        self._n_tap = n_tap
+        # Numerically controlled oscillator for a frame starting at phase 0,
+        # and the phase increment in cycles between frames.
+        mix = (mix_frequency / ih.sample_rate).to_value(u.one)
+        n = np.arange(self._padded_samples_per_frame)
+        self._nco = np.exp(-2j * np.pi * ((mix * n) % 1.)).astype(
+            dtype).reshape((-1,) + (1,) * len(self.sample_shape))
+        self._frame_phase = (mix * samples_per_frame * decimation) % 1.
+        self.mix_frequency = mix_frequency
+
+        if self._frequency is not None:
+            self._frequency = self._frequency + mix_frequency * self.sideband
+
+    def _read_frame(self, frame_index):
+        # Read data from underlying filehandle, at the frame's input offset.
+        self.ih.seek(frame_index * self.samples_per_frame * self._decimation)
+        data = self.ih.read(self._padded_samples_per_frame)
+        result = self.task(data * self._nco[:len(data)])
+        # Correct the oscillator phase for the start of the frame.
+        result *= np.exp(-2j * np.pi * ((self._frame_phase * frame_index)
+                                        % 1.)).astype(self.dtype)
+        return result
+
+    def task(self, data):
+        """Low-pass filter and decimate mixed data for one frame."""
+        # View the data as blocks of ``decimation`` samples, so that output
+        # sample m is the sum over taps t of block m+t times filter branch t.
+        n_block = self.samples_per_frame + self._n_tap - 1
+        blocks = data[:n_block * self._decimation].reshape(
+            (n_block, self._decimation) + data.shape[1:])
+        result = np.zeros((self.samples_per_frame,) + self.sample_shape,
+                          self.dtype)
+        for tap, branch in enumerate(self._filter):
+            result += np.einsum('bk...,k->b...',
+                                blocks[tap:tap+self.samples_per_frame], branch)
+        return result
@@ -1,13 +1,15 @@
 # Licensed under the GPLv3 - see LICENSE
 """Convolution tasks."""
+import time
+
 import numpy as np
 from astropy.utils import lazyproperty
 
 from .base import PaddedTaskBase, check_broadcast_to
-from .fourier import get_fft_maker
+from .fourier import get_fft_maker, NumpyFFTMaker
 
 
-__all__ = ['ConvolveSamples', 'Convolve']
+__all__ = ['ConvolveSamples', 'Convolve', 'ConvolveBank']
 
 
 class ConvolveSamples(PaddedTaskBase):
@@ -48,15 +50,23 @@ class ConvolveSamples(PaddedTaskBase):
         self._response = response
 
     def task(self, data):
-        result = np.empty((self.samples_per_frame,) + self.sample_shape,
-                          dtype=self.dtype)
-        response = np.broadcast_to(self._response,
-                                   self._response.shape[:1]+self.sample_shape)
-        for index in np.ndindex(self.sample_shape):
-            index = (slice(None),) + index
-            result[index] = np.convolve(data[index], response[index],
-                                        mode='valid')
-        return result
+        # Convolve all elements of the samples in one go, by adding slices
+        # of the data shifted by one sample for each element of the response.
+        # The last element of the response multiplies the earliest sample.
+        # Sums are accumulated in the type np.convolve would use, which for
+        # real and single-precision complex data makes the result identical
+        # to convolving each element separately.  For double-precision
+        # complex data, np.convolve sums in a different order, and results
+        # can differ in the last bit.
+        n = self.samples_per_frame
+        response = self._response
+        n_response = response.shape[0]
+        dtype = np.result_type(data, response)
+        result = np.multiply(data[:n], response[-1], dtype=dtype)
+        for i in range(1, n_response):
+            result += np.multiply(data[i:i+n], response[n_response-1-i],
+                                  dtype=dtype)
+        return result.astype(self.dtype, copy=False)
 
 
 class Convolve(ConvolveSamples):
@@ -64,6 +74,9 @@ class Convolve(ConvolveSamples):
 
     The convolution is done via multiplication in the Fourier domain, which
     is faster than direct convolution for all but very simple responses.
+    Optionally, the fastest of direct convolution, a Fourier transform of
+    the whole frame, and overlap-add with smaller Fourier transforms can be
+    selected automatically.
 
     Parameters
     ----------
@@ -85,21 +98,119 @@ class Convolve(ConvolveSamples):
         FFT maker.  Default: `None`, in which case the channelizer uses the
         default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
         available, otherwise numpy).
+    method : {'fft', 'direct', 'overlap-add', 'auto'}, optional
+        How to do the convolution: by Fourier transforming the whole frame
+        (default), directly in the time domain (as for
+        `~scintillometry.convolution.ConvolveSamples`), using overlap-add with
+        Fourier transforms of blocks of ``block_size`` samples, or by choosing
+        the one expected to be fastest.
+    calibrate : bool, optional
+        For ``method='auto'``, whether to choose the method by timing each
+        on a frame of data on first use, rather than by estimating the number
+        of operations.  Since the estimates are only valid for numpy's Fourier
+        transforms, methods are always timed for other FFT engines.
+        Default: `False`.
+    block_size : int, optional
+        Size of the Fourier transforms used for overlap-add.  Should be at
+        least ``2 * len(response) - 1``.  Default: the
+        power of two just above 4 times the response length (or 64 if that
+        is larger).
 
     See Also
     --------
     ConvolveSamples : convolution in the time domain (for simple responses)
     """
+    _methods = ('fft', 'direct', 'overlap-add')
+
     def __init__(self, ih, response, offset=0, samples_per_frame=None,
-                 FFT=None):
+                 FFT=None, method='fft', calibrate=False, block_size=None):
+        if method not in self._methods + ('auto',):
+            raise ValueError("method should be one of {}."
+                             .format(self._methods + ('auto',)))
         super().__init__(ih, response=response, offset=offset,
                          samples_per_frame=samples_per_frame)
-        # Initialize FFTs for fine channelization and the inverse.
         self._FFT = get_fft_maker(FFT)
-        self._fft = self._FFT(shape=(self._padded_samples_per_frame,) +
-                              self.ih.sample_shape,
-                              sample_rate=self.ih.sample_rate, dtype=self.ih.dtype)
-        self._ifft = self._fft.inverse()
+        if block_size is None:
+            block_size = max(
+                2 ** int(np.ceil(np.log2(4 * self._response.shape[0]))), 64)
+        elif block_size < 2 * self._response.shape[0] - 1:
+            # Each block should hold at least as many new samples as the
+            # convolution tail that spills into the next block.
+            raise ValueError("block_size should be at least twice the length "
+                             "of the response minus one.")
+        self._block_size = block_size
+        self._method = method
+        self._calibrate = calibrate
+
+    @lazyproperty
+    def method(self):
+        """Convolution method used.
+
+        If ``method='auto'`` was passed in, the method is determined on first
+        access, by estimating or measuring the time taken by each method.
+        """
+        if self._method != 'auto':
+            return self._method
+
+        if self._calibrate or not isinstance(self._FFT, NumpyFFTMaker):
+            data = np.zeros((self._padded_samples_per_frame,) +
+                            self.ih.sample_shape, self.ih.dtype)
+            times = {}
+            for method in self._candidates:
+                task = getattr(self, self._task_names[method])
+                task(data)  # Ensure FFTs are initialized.
+                start = time.perf_counter()
+                task(data)
+                times[method] = time.perf_counter() - start
+        else:
+            times = self._estimate_cost()
+
+        return min(times, key=times.get)
+
+    _task_names = {'fft': '_task_fft',
+                   'direct': '_task_direct',
+                   'overlap-add': '_task_overlap_add'}
+
+    @property
+    def _candidates(self):
+        """Methods that make sense for the frame size and response."""
+        if self._block_size < self._padded_samples_per_frame:
+            return self._methods
+        return self._methods[:2]
+
+    def _estimate_cost(self):
+        """Estimate the relative cost of each method.
+
+        Uses rough timings per element of a sample, in ns, for numpy on
+        complex data: 6 per response element per output sample for direct
+        convolution, ``3.3 n log2(n)`` for a Fourier transform and its
+        inverse of length ``n``, and a further 10 per sample for overlap-add
+        bookkeeping.  For real data, direct convolution is about three
+        times, and Fourier transforms about 1.5 times faster.
+        """
+        n_response = self._response.shape[0]
+        n_frame = self._padded_samples_per_frame
+        real = self.ih.dtype.kind != 'c'
+        direct_scale, fft_scale = (1 / 3, 2 / 3) if real else (1, 1)
+        cost = {'direct': (6 * n_response * self.samples_per_frame *
+                           direct_scale),
+                'fft': 3.3 * n_frame * np.log2(n_frame) * fft_scale}
+        if 'overlap-add' in self._candidates:
+            n_block = self._block_size
+            n_seg = -(-n_frame // (n_block - n_response + 1))
+            cost['overlap-add'] = n_seg * n_block * (
+                3.3 * np.log2(n_block) * fft_scale + 10)
+        return cost
+
+    @lazyproperty
+    def _fft(self):
+        return self._FFT(shape=(self._padded_samples_per_frame,) +
+                         self.ih.sample_shape,
+                         sample_rate=self.ih.sample_rate, dtype=self.ih.dtype)
+
+    @lazyproperty
+    def _ifft(self):
+        return self._fft.inverse()
 
     @lazyproperty
     def _ft_response(self):
@@ -109,15 +220,154 @@ class Convolve(ConvolveSamples):
         fft = self._FFT(shape=long_response.shape, dtype=self.dtype)
         return fft(long_response)
 
+    @lazyproperty
+    def _block_fft(self):
+        n_response = self._response.shape[0]
+        n_seg = -(-self._padded_samples_per_frame //
+                  (self._block_size - n_response + 1))
+        return self._FFT(shape=(n_seg, self._block_size) +
+                         self.ih.sample_shape, dtype=self.ih.dtype, axis=1)
+
+    @lazyproperty
+    def _block_ifft(self):
+        return self._block_fft.inverse()
+
+    @lazyproperty
+    def _block_ft_response(self):
+        block_response = np.zeros((self._block_size,) +
+                                  self._response.shape[1:], self.dtype)
+        block_response[:self._response.shape[0]] = self._response
+        fft = self._FFT(shape=block_response.shape, dtype=self.dtype)
+        return fft(block_response)
+
     def task(self, data):
+        return getattr(self, self._task_names[self.method])(data)
+
+    _task_direct = ConvolveSamples.task
+
+    def _task_fft(self, data):
         ft = self._fft(data)
         ft *= self._ft_response
         result = self._ifft(ft)
         return result[self._pad_start + self._pad_end:]
 
+    def _task_overlap_add(self, data):
+        # Split the frame in segments, and convolve each in a block large
+        # enough to hold the full convolution with the response.
+        n_response = self._response.shape[0]
+        n_block = self._block_size
+        n_step = n_block - n_response + 1
+        n_seg = self._block_fft.time_shape[0]
+        blocks = np.zeros(self._block_fft.time_shape, data.dtype)
+        n_full, n_rest = divmod(data.shape[0], n_step)
+        blocks[:n_full, :n_step] = data[:n_full * n_step].reshape(
+            (n_full, n_step) + data.shape[1:])
+        if n_rest:
+            blocks[n_full, :n_rest] = data[n_full * n_step:]
+        ft = self._block_fft(blocks)
+        ft *= self._block_ft_response
+        convolved = self._block_ifft(ft)
+        # Add overlapping parts of consecutive blocks.
+        result = np.zeros(((n_seg + 1) * n_step,) + self.sample_shape,
+                          self.dtype)
+        result[:n_seg * n_step].reshape(
+            (n_seg, n_step) + self.sample_shape)[...] = convolved[:, :n_step]
+        result[n_step:].reshape(
+            (n_seg, n_step) + self.sample_shape)[:, :n_response-1] += (
+                convolved[:, n_step:])
+        # Select the valid part.
+        start = self._pad_start + self._pad_end
+        return result[start:start + self.samples_per_frame]
+
     def close(self):
         super().close()
         # Clear the caches of the lazyproperties to release memory.
         del self._ft_response
         del self._fft
         del self._ifft
+        del self._block_ft_response
+        del self._block_fft
+        del self._block_ifft
+
+
+class ConvolveBank(PaddedTaskBase):
+    """Convolve a time stream with a bank of responses.
+
+    Like `~scintillometry.convolution.Convolve`, but for many responses at
+    the same time.  Each frame is Fourier transformed only once, and then
+    multiplied with the Fourier transforms of all responses, which are
+    calculated once.  The output has a new axis for the responses, i.e.,
+    its sample shape is ``(n_response,) + ih.sample_shape``.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    responses : `~numpy.ndarray`
+        Responses to convolve the time stream with, with the first axis
+        indexing the responses and the second the response samples.  If
+        two-dimensional, assumed to apply to all elements of a sample of
+        ``ih``.  Otherwise, the remaining dimensions should broadcast to the
+        sample shape of ``ih``.
+    offset : int, optional
+        Where samples should be considered to be taken from.  For the default
+        of 0, a given sample has the same time as the convolution of the filter
+        with all preceding samples.
+    samples_per_frame : int, optional
+        Number of samples which should be convolved in one go. The number of
+        output convolved samples per frame will be smaller to avoid wrapping.
+        If not given, the minimum power of 2 needed to get at least 75%
+        efficiency.
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the channelizer uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+
+    See Also
+    --------
+    Convolve : convolution with a single response
+    """
+    def __init__(self, ih, responses, offset=0, samples_per_frame=None,
+                 FFT=None):
+        responses = np.asanyarray(responses)
+        if responses.ndim == 2:
+            responses = responses.reshape(responses.shape +
+                                          (1,) * (ih.ndim - 1))
+        else:
+            check_broadcast_to(responses,
+                               responses.shape[:2] + ih.sample_shape)
+
+        pad = responses.shape[1] - 1
+        super().__init__(ih, pad_start=pad-offset, pad_end=offset,
+                         samples_per_frame=samples_per_frame)
+        # Add the axis for the responses to the shape.
+        self._shape = self._shape[:1] + responses.shape[:1] + ih.sample_shape
+        # Store the responses with time as the first axis.
+        self._responses = responses.swapaxes(0, 1)
+        self._FFT = get_fft_maker(FFT)
+        self._fft = self._FFT(shape=(self._padded_samples_per_frame,) +
+                              ih.sample_shape,
+                              sample_rate=ih.sample_rate, dtype=ih.dtype)
+        self._ifft = self._FFT(shape=(self._padded_samples_per_frame,) +
+                               self.sample_shape,
+                               sample_rate=ih.sample_rate,
+                               dtype=ih.dtype).inverse()
+
+    @lazyproperty
+    def _ft_responses(self):
+        long_responses = np.zeros((self._padded_samples_per_frame,) +
+                                  self._responses.shape[1:], self.dtype)
+        long_responses[:self._responses.shape[0]] = self._responses
+        fft = self._FFT(shape=long_responses.shape, dtype=self.dtype)
+        return fft(long_responses)
+
+    def task(self, data):
+        ft = self._fft(data)
+        ft = ft[:, np.newaxis] * self._ft_responses
+        result = self._ifft(ft)
+        return result[self._pad_start + self._pad_end:]
+
+    def close(self):
+        super().close()
+        # Clear the caches of the lazyproperties to release memory.
+        del self._ft_responses
@@ -4,13 +4,43 @@ import numpy as np
 from .base import TaskBase, check_broadcast_to, simplify_shape
 
 
-__all__ = ['Square', 'Power']
+__all__ = ['Square', 'Power', 'Stokes']
 
 
 def complex_square(z):
     return np.square(z.real) + np.square(z.imag)
 
 
+def power_terms(xr, xi, yr, yi, out):
+    """Calculate powers and cross terms from real and imaginary parts.
+
+    All terms are calculated directly in the output array, using it and
+    the input arrays as scratch space, so that no temporaries are needed.
+
+    Parameters
+    ----------
+    xr, xi, yr, yi : `~numpy.ndarray`
+        Real and imaginary parts of the two polarizations.  Will be
+        overwritten.
+    out : `~numpy.ndarray`
+        Output array, with the first axis of length 4 holding
+        ``|x|**2``, ``|y|**2``, ``Re(x y*)`` and ``Im(x y*)``.
+    """
+    xx, yy, re, im = out
+    np.multiply(xi, yr, out=im)
+    np.multiply(xr, yi, out=re)
+    im -= re
+    np.multiply(xr, yr, out=re)
+    np.multiply(xi, yi, out=xx)
+    re += xx
+    np.multiply(xr, xr, out=xx)
+    xi *= xi
+    xx += xi
+    np.multiply(yr, yr, out=yy)
+    yi *= yi
+    yy += yi
+
+
 class Square(TaskBase):
     """Converts samples to intensities by squaring.
 
@@ -41,6 +71,47 @@ class Square(TaskBase):
                 self._polarization, self._polarization)
 
 
+def power_polarization(polarization, sample_shape):
+    """Get polarization labels for powers and cross terms.
+
+    Parameters
+    ----------
+    polarization : array or (nested) list of char
+        Polarization labels.  Should broadcast to the sample shape and
+        contain exactly two distinct labels.
+    sample_shape : tuple
+        Sample shape of the stream the labels apply to.
+
+    Returns
+    -------
+    polarization : `~numpy.ndarray`
+        Labels for the power and cross terms, with the two labels of the
+        input replaced by four, in the order XX, YY, XY, YX.
+    axis : int
+        Axis of the polarization labels, counted from the end (i.e.,
+        it is negative).
+
+    Raises
+    ------
+    ValueError
+        If the number of polarizations is not equal to two or the
+        polarization labels are not unique.
+    """
+    # Check that input has consistent shape
+    broadcast = check_broadcast_to(polarization, sample_shape)
+    polarization = simplify_shape(broadcast)
+    if polarization.size != 2:
+        raise ValueError("need exactly 2 polarizations.  Reshape stream "
+                         "appropriately.")
+    # polarization is guaranteed to have 2 distinct items.
+    pol_axis = polarization.shape.index(2)
+    pol_swap = polarization.swapaxes(0, pol_axis)
+    pol_swap = np.core.defchararray.add(pol_swap[[0, 1, 0, 1]],
+                                        pol_swap[[0, 1, 1, 0]])
+    polarization = pol_swap.swapaxes(0, pol_axis)
+    return polarization, pol_axis - polarization.ndim
+
+
 class Power(TaskBase):
     """Calculate powers and cross terms for two polarizations.
 
@@ -76,40 +147,123 @@ class Power(TaskBase):
     def __init__(self, ih, polarization=None):
         if polarization is None:
             polarization = ih.polarization
-        else:
-            # Check that input has consistent shape
-            broadcast = check_broadcast_to(polarization, ih.sample_shape)
-            polarization = simplify_shape(broadcast)
-
-        if polarization.size != 2:
-            raise ValueError("need exactly 2 polarizations.  Reshape stream "
-                             "appropriately.")
-        # polarization is guaranteed to have 2 distinct items.
-        pol_axis = polarization.shape.index(2)
-        pol_swap = polarization.swapaxes(0, pol_axis)
-        pol_swap = np.core.defchararray.add(pol_swap[[0, 1, 0, 1]],
-                                            pol_swap[[0, 1, 1, 0]])
-        polarization = pol_swap.swapaxes(0, pol_axis)
-
-        self._axis = ih.ndim - polarization.ndim + pol_axis
+
+        polarization, pol_axis = power_polarization(polarization,
+                                                    ih.sample_shape)
+        self._axis = ih.ndim + pol_axis
         shape = ih.shape[:self._axis] + (4,) + ih.shape[self._axis+1:]
 
         ih_dtype = np.dtype(ih.dtype)
         if ih_dtype.kind != 'c':
-            raise ValueError("{} only works on a complex timestream.")
+            raise ValueError("{} only works on a complex timestream."
+                             .format(type(self).__name__))
         dtype = np.zeros(1, ih_dtype).real.dtype
 
         super().__init__(ih, shape=shape, polarization=polarization, dtype=dtype)
 
+    # Number of elements per term to calculate in one go; small enough that
+    # all intermediate arrays should fit in the cache.
+    _block_size = 2**14
+    # Order in which to take the polarizations from the underlying stream.
+    _order = (0, 1)
+
     def task(self, data):
         """Calculate the polarization powers and cross terms for one frame."""
         result = np.empty(data.shape[:1] + self.shape[1:], self.dtype)
-        # Get views in which the axis with the polarization is first.
-        in_ = data.swapaxes(0, self._axis)
-        out = result.swapaxes(0, self._axis)
-        out[0] = complex_square(in_[0])
-        out[1] = complex_square(in_[1])
-        c = in_[0] * in_[1].conj()
-        out[2] = c.real
-        out[3] = c.imag
+        # Go through the frame in blocks, copying real and imaginary parts
+        # to contiguous scratch space and calculating the terms from those,
+        # so that no complex or frame-sized temporaries are needed.
+        n = max(2 * self._block_size // data[0].size, 1)
+        scratch = None
+        for start in range(0, data.shape[0], n):
+            # Get views in which the axis with the polarization is first.
+            in_ = data[start:start+n].swapaxes(0, self._axis)
+            out = result[start:start+n].swapaxes(0, self._axis)
+            if scratch is None or scratch.shape[1:] != out.shape[1:]:
+                scratch = np.empty((8,) + out.shape[1:], self.dtype)
+            x, y = in_[self._order[0]], in_[self._order[1]]
+            for i, part in enumerate((x.real, x.imag, y.real, y.imag)):
+                np.copyto(scratch[i], part)
+            power_terms(*scratch[:4], out=scratch[4:])
+            self._set_terms(scratch[4:], out)
+
         return result
+
+    def _set_terms(self, terms, out):
+        """Store XX, YY, Re(XY*), Im(XY*) in the output."""
+        out[...] = terms
+
+
+class Stokes(Power):
+    """Calculate Stokes parameters for two polarizations.
+
+    For linear feeds, with polarizations X and Y, or circular feeds, with
+    polarizations R and L, the Stokes parameters are calculated as follows:
+
+    ========= ========================= =========================
+    Parameter Linear                    Circular
+    ========= ========================= =========================
+    I         Re(X X*) + Re(Y Y*)       Re(R R*) + Re(L L*)
+    Q         Re(X X*) - Re(Y Y*)       2 Re(R L*)
+    U         2 Re(X Y*)                -2 Im(R L*)
+    V         -2 Im(X Y*)               Re(R R*) - Re(L L*)
+    ========= ========================= =========================
+
+    The order of the polarizations in the underlying stream does not
+    matter.  The calculation is done in a single pass, without intermediate
+    complex products.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream.
+    polarization : array or (nested) list of char, optional
+        Polarization labels.  Should broadcast to the sample shape,
+        i.e., the labels are in the correct axis.  For instance,
+        ``['X', 'Y']``, or ``[['L'], ['R']]``.  By default, taken
+        from the underlying stream.  The output labels are
+        'I', 'Q', 'U', and 'V'.
+
+    Raises
+    ------
+    AttributeError
+        If no polarization information is given.
+    ValueError
+        If the underlying stream is not complex, the number of polarizations
+        not equal to two, or the polarization labels not either X and Y,
+        or L and R.
+    """
+    def __init__(self, ih, polarization=None):
+        super().__init__(ih, polarization=polarization)
+        # Labels of the two input polarizations, taken from the XX and YY
+        # terms set up by Power.
+        labels = [p[:len(p) // 2] for p in
+                  np.moveaxis(self._polarization, self._axis - self.ndim,
+                              0).reshape(4, -1)[:2, 0]]
+        # Determine the order in which the polarizations should be taken
+        # for the terms calculated by Power, and where combinations of those
+        # terms should be stored.
+        if set(labels) == {'X', 'Y'}:
+            # Terms XX+YY, XX-YY, Re(XY*), Im(XY*) go in I, Q, U, V.
+            self._order = (0, 1) if labels[0] == 'X' else (1, 0)
+            self._indices = (0, 1, 2, 3)
+        elif set(labels) == {'R', 'L'}:
+            # Terms RR+LL, RR-LL, Re(RL*), Im(RL*) go in I, V, Q, U.
+            self._order = (0, 1) if labels[0] == 'R' else (1, 0)
+            self._indices = (0, 3, 1, 2)
+        else:
+            raise ValueError("polarization labels should be X and Y for "
+                             "linear feeds, or R and L for circular ones.")
+        self._polarization = np.array(['I', 'Q', 'U', 'V']).reshape(
+            (4,) + (1,) * (self.ndim - self._axis - 1))
+
+    def _set_terms(self, terms, out):
+        """Combine XX, YY, Re(XY*), Im(XY*) to Stokes parameters."""
+        xx, yy, re, im = terms
+        xx += yy
+        yy *= -2
+        yy += xx
+        re *= 2
+        im *= -2
+        for index, term in zip(self._indices, terms):
+            out[index] = term
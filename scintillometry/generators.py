@@ -4,12 +4,19 @@
 All these look like stream readers and thus are useful to test pipelines
 with artificial data.
 """
+import operator
+
 import numpy as np
+import astropy.units as u
 
 from .base import Base
+from .dm import DispersionMeasure
+from .fourier import get_fft_maker
+from .integration import evaluate_phase
 
 
-__all__ = ['StreamGenerator', 'EmptyStreamGenerator', 'Noise', 'NoiseGenerator']
+__all__ = ['StreamGenerator', 'EmptyStreamGenerator', 'Noise', 'NoiseGenerator',
+           'PulsarSignalGenerator']
 
 
 class StreamGenerator(Base):
@@ -145,58 +152,74 @@ class EmptyStreamGenerator(Base):
 class Noise:
     """Helper class providing source callables for NoiseSource.
 
-    When called, will provide a frame worth of normally distributed data,
-    but also keep the state of the random number generator, so that if the
-    same frame is read again, this state can be reused to ensure the same
-    data are regenerated.
+    When called, will provide a frame worth of normally distributed data.
+    The data are generated with a counter-based random number generator
+    (`~numpy.random.Philox`) that is seeded using the frame index, so that
+    any frame can be regenerated independently of any other, without
+    needing to store state.  This also implies that frames can be generated
+    in parallel.
 
     Parameters
     ----------
-    seed : int
-       Initial seed for `~numpy.random.RandomState`.
+    seed : int or `~numpy.random.SeedSequence`
+       Initial seed for `~numpy.random.SeedSequence`, or an instance.
+       If not given, a seed is taken from the operating system.
 
     Notes
     -----
-    Data is identical between invocations only if seeded identically *and*
-    read in the same order.
+    Data is identical between invocations if seeded identically and if the
+    number of samples per frame is the same.
     """
     def __init__(self, seed=None):
-        self._random_state = np.random.RandomState(seed)
-        self._states = {}
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self._seed_sequence = seed
 
     def __call__(self, sh):
-        rs = self._random_state
-        offset = sh.tell()
-        done_this = offset in self._states
-        old_state = rs.get_state()
-        if done_this:
-            rs.set_state(self._states[offset])
-        else:
-            self._states[offset] = old_state
+        return self.generate(sh.tell() // sh.samples_per_frame,
+                             (sh.samples_per_frame,) + sh.sample_shape,
+                             sh.dtype)
 
-        shape = (sh.samples_per_frame,) + sh.sample_shape
-        if sh.complex_data:
-            shape = shape[:-1] + (shape[-1] * 2,)
-        numbers = rs.normal(size=shape)
-        if sh.complex_data:
-            numbers = numbers.view(np.complex128)
-        numbers = numbers.astype(sh.dtype, copy=False)
+    def generate(self, index, shape, dtype):
+        """Generate normally distributed numbers for a given frame.
 
-        # reset to old state if needed.
-        if done_this:
-            rs.set_state(old_state)
+        Parameters
+        ----------
+        index : int
+            Index of the frame, used to seed the random number generator.
+        shape : tuple
+            Shape of the frame.
+        dtype : `~numpy.dtype`
+            Data type.  For complex data, both real and imaginary parts are
+            normally distributed.
+        """
+        seed_sequence = np.random.SeedSequence(
+            self._seed_sequence.entropy,
+            spawn_key=self._seed_sequence.spawn_key + (index,))
+        rng = np.random.Generator(np.random.Philox(seed_sequence))
 
-        return numbers
+        dtype = np.dtype(dtype)
+        if dtype.kind == 'c':
+            shape = shape[:-1] + (shape[-1] * 2,)
+        real_dtype = dtype.type(0).real.dtype
+        if real_dtype not in (np.float32, np.float64):
+            real_dtype = np.dtype(np.float64)
+        numbers = rng.standard_normal(size=shape, dtype=real_dtype)
+        if dtype.kind == 'c':
+            numbers = numbers.view(np.result_type(real_dtype, 1j))
+        return numbers.astype(dtype, copy=False)
 
 
 class NoiseGenerator(StreamGenerator):
     """Genertator of a stream of normally distributed noise.
 
     To mimic proper streams, data is guaranteed to be identical if read
-    multiple times from a given instance.  This is done by storing the state
-    of the random number generator for each "data frame". Given this, it is
-    important to choose ``samples_per_frame`` wisely, such that frame sizes
-    are at least of order millions of samples.
+    multiple times from a given instance, independent of the order in which
+    it is read.  This is done by seeding the random number generator for
+    each "data frame" using the frame index (see
+    `~scintillometry.generators.Noise`).
+    Since creating a generator has some overhead, it is best to choose
+    ``samples_per_frame`` such that frames are not too small.
 
     Parameters
     ----------
@@ -227,9 +250,8 @@ class NoiseGenerator(StreamGenerator):
 
     Notes
     -----
-    Between instances, data is identical only if seeded identically *and* if
-    first access of frames is done in the same order, with the same number of
-    samples per frame.
+    Between instances, data is identical if seeded identically and if the
+    number of samples per frame is the same.
     """
     def __init__(self, shape, start_time, sample_rate, samples_per_frame,
                  frequency=None, sideband=None, polarization=None,
@@ -240,3 +262,222 @@ class NoiseGenerator(StreamGenerator):
                          samples_per_frame=samples_per_frame,
                          frequency=frequency, sideband=sideband,
                          polarization=polarization, dtype=dtype)
+
+
+class PulsarSignalGenerator(Base):
+    """Generator of a stream with a dispersed and scattered pulsar signal.
+
+    The intrinsic pulsar signal is modelled as normally distributed noise
+    modulated with the square root of the pulse profile, so that on average
+    its intensity follows the profile.  In each frame, this signal is
+    propagated in the Fourier domain, applying dispersion (using
+    `~scintillometry.dm.DispersionMeasure.phase_factor`) and scattering
+    (a convolution with a one-sided exponential, which on average smears
+    the intensity with an exponential of the given scattering time), and
+    background noise is added.
+
+    Frames are generated independently, with random numbers seeded by
+    frame index (see `~scintillometry.generators.Noise`), so data are
+    identical when read multiple times, in any order.  To avoid wrapping
+    in the Fourier domain, frames are padded by the maximum dispersion
+    delay and ten scattering times.
+
+    Parameters
+    ----------
+    phase : callable
+        Should return pulse phases for given input time(s), as an
+        `~astropy.units.Quantity` with angular units or a
+        `~scintillometry.phases.Phase` instance.  Gives the pulse phase
+        at the reference frequency.
+    profile : callable or array
+        Intensity as a function of pulse phase.  If callable, it will be
+        passed the fractional phase as an array of float in units of cycles
+        (with shape ``(n,) + (1,) * len(sample_shape)``).  Otherwise, it is
+        taken to be the profile sampled in equally spaced phase bins,
+        starting at phase 0.  Intensities should not be negative.
+    shape : tuple
+        First element is the total number of samples of the fake file,
+        the others are the sample shape.
+    start_time : `~astropy.time.Time`
+        Start time of the fake file.
+    sample_rate : `~astropy.units.Quantity`
+        Sample rate, in units of frequency.
+    samples_per_frame : int
+        Number of samples to generate in one go.  Should be substantially
+        larger than the padding needed for dispersion and scattering.
+    frequency : `~astropy.units.Quantity`, optional
+        Frequencies for each channel.  Should be broadcastable to the
+        sample shape.  Needed if ``dm`` is given.
+    sideband : array, optional
+        Whether frequencies are upper (+1) or lower (-1) sideband.
+        Should be broadcastable to the sample shape.  Needed if ``dm``
+        is given.
+    polarization : array or (nested) list of char, optional
+        Polarization labels.  Should broadcast to the sample shape,
+        i.e., the labels are in the correct axis.  Default: unknown.
+    dtype : `~numpy.dtype` or anything that initializes one, optional
+        Type of data produced.  Default: ``complex64``.
+    dm : float or `~scintillometry.dm.DispersionMeasure` quantity, optional
+        Dispersion measure.  Default: no dispersion.  If given, ``frequency``
+        and ``sideband`` are required.
+    reference_frequency : `~astropy.units.Quantity`, optional
+        Frequency at which pulses arrive at the times given by ``phase``.
+        By default, the mean frequency.
+    scattering_time : `~astropy.units.Quantity`, optional
+        Exponential scattering time.  Default: no scattering.
+    noise_level : float, optional
+        Standard deviation of the background noise, relative to that of the
+        pulsar signal for unit profile intensity.  Default: 1.
+    seed : int, optional
+        Possible seed to initialize the random number generators.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        Tolerance for interpolating phases within a frame; see
+        `~scintillometry.integration.evaluate_phase`.  Default: `None`, i.e.,
+        calculate phases for every sample.
+    FFT : FFT maker or None, optional
+        FFT maker.  Default: `None`, in which case the generator uses the
+        default from `~scintillometry.fourier.base.get_fft_maker` (pyfftw if
+        available, otherwise numpy).
+    """
+    _scattering_extent = 10
+
+    def __init__(self, phase, profile, shape, start_time, sample_rate,
+                 samples_per_frame, frequency=None, sideband=None,
+                 polarization=None, dtype=np.complex64, dm=None,
+                 reference_frequency=None, scattering_time=None,
+                 noise_level=1., seed=None, phase_tolerance=None, FFT=None):
+        super().__init__(shape=shape, start_time=start_time,
+                         sample_rate=sample_rate,
+                         samples_per_frame=samples_per_frame,
+                         frequency=frequency, sideband=sideband,
+                         polarization=polarization, dtype=dtype)
+        self.phase = phase
+        self.profile = profile
+        self.noise_level = noise_level
+        self.phase_tolerance = phase_tolerance
+        self._signal_noise, self._background_noise = [
+            Noise(seed_sequence)
+            for seed_sequence in np.random.SeedSequence(seed).spawn(2)]
+
+        pad_start = pad_end = 0
+        if dm is not None:
+            if self._frequency is None or self._sideband is None:
+                raise ValueError("frequency and sideband are needed to "
+                                 "apply dispersion.")
+            dm = DispersionMeasure(dm)
+            half_rate = self.sample_rate / 2.
+            if self.complex_data:
+                freq_low = self.frequency - half_rate
+                freq_high = self.frequency + half_rate
+            else:
+                freq_low = (self.frequency +
+                            np.minimum(self.sideband, 0.) * half_rate)
+                freq_high = (self.frequency +
+                             np.maximum(self.sideband, 0.) * half_rate)
+            if reference_frequency is None:
+                reference_frequency = (freq_low + freq_high).mean() / 2.
+
+            delay_low = dm.time_delay(freq_low, reference_frequency)
+            delay_high = dm.time_delay(freq_high, reference_frequency)
+            delay_max = max(delay_low.max(), delay_high.max())
+            delay_min = min(delay_low.min(), delay_high.min())
+            pad_start = max(0, int(np.ceil(
+                (delay_max * self.sample_rate).to_value(u.one))))
+            pad_end = max(0, int(np.ceil(
+                (-delay_min * self.sample_rate).to_value(u.one))))
+
+        if scattering_time is not None:
+            scattering_time = u.Quantity(scattering_time, u.s)
+            if scattering_time <= 0:
+                raise ValueError("scattering time should be positive.")
+            pad_start += int(np.ceil(
+                (self._scattering_extent * scattering_time *
+                 self.sample_rate).to_value(u.one)))
+
+        self.dm = dm
+        self.reference_frequency = reference_frequency
+        self.scattering_time = scattering_time
+        self._pad_start = operator.index(pad_start)
+        self._pad_end = operator.index(pad_end)
+        self._padded_samples_per_frame = (self.samples_per_frame +
+                                          self._pad_start + self._pad_end)
+        if dm is not None or scattering_time is not None:
+            self._FFT = get_fft_maker(FFT)
+            self._fft = self._FFT(shape=((self._padded_samples_per_frame,) +
+                                         self.sample_shape),
+                                  sample_rate=self.sample_rate,
+                                  dtype=self.dtype)
+            self._ifft = self._fft.inverse()
+            self._transfer = self._get_transfer()
+        else:
+            self._transfer = None
+
+    def _get_transfer(self):
+        """Fourier-domain response for dispersion and scattering."""
+        transfer = np.ones(self._fft.frequency_shape,
+                           self._fft.frequency_dtype)
+        if self.dm is not None:
+            frequency = self.frequency + self._fft.frequency * self.sideband
+            phase_factor = self.dm.phase_factor(frequency,
+                                                self.reference_frequency)
+            # For lower sideband, the phases run the other way.
+            transfer *= (phase_factor.real +
+                         1j * self.sideband * phase_factor.imag)
+
+        if self.scattering_time is not None:
+            # One-sided exponential impulse response, normalized such that
+            # the power is preserved.
+            n = np.arange(self._padded_samples_per_frame)
+            response = np.exp(-0.5 * n / (self.scattering_time *
+                                          self.sample_rate).to_value(u.one))
+            response /= np.sqrt((response ** 2).sum())
+            response = (
+                response.reshape((-1,) + (1,) * len(self.sample_shape)) *
+                np.ones(self.sample_shape, self.dtype))
+            transfer *= self._fft(response.astype(self.dtype, copy=False))
+
+        return transfer
+
+    def _intensity(self, offset, n):
+        """Profile intensities for n samples starting at offset."""
+        offsets = offset + np.arange(n)
+        phases = evaluate_phase(self.phase, self.start_time, offsets,
+                                self.sample_rate, self.phase_tolerance)
+        phases = ((phases % (1. * u.cycle)).to_value(u.cycle)
+                  .reshape((-1,) + (1,) * len(self.sample_shape)))
+        if callable(self.profile):
+            return self.profile(phases)
+
+        profile = np.asanyarray(self.profile)
+        return profile[(phases * len(profile)).astype(int) % len(profile)]
+
+    def _signal(self, frame_index):
+        """Intrinsic signal, including padding, for the given frame."""
+        # Noise is generated in blocks of samples_per_frame starting at
+        # -pad_start, so that padded frames start at the start of a block.
+        spf = self.samples_per_frame
+        n_block = -(-self._padded_samples_per_frame // spf)
+        noise = np.concatenate([
+            self._signal_noise.generate(frame_index + i,
+                                        (spf,) + self.sample_shape,
+                                        self.dtype)
+            for i in range(n_block)])[:self._padded_samples_per_frame]
+        intensity = self._intensity(frame_index * spf - self._pad_start,
+                                    self._padded_samples_per_frame)
+        noise *= np.sqrt(intensity)
+        return noise
+
+    def _read_frame(self, frame_index):
+        data = self._signal(frame_index)
+        if self._transfer is not None:
+            ft = self._fft(data)
+            ft *= self._transfer
+            data = self._ifft(ft)[self._pad_start:
+                                  self._pad_start + self.samples_per_frame]
+        if self.noise_level:
+            background = self._background_noise.generate(
+                frame_index, (self.samples_per_frame,) + self.sample_shape,
+                self.dtype)
+            background *= self.noise_level
+            data += background
+        return data.astype(self.dtype, copy=False)
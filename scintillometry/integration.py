@@ -2,7 +2,8 @@
 """Tasks for integration over time and pulse phase."""
 
 import operator
-import warnings
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import astropy.units as u
@@ -11,7 +12,9 @@ from astropy.utils import ShapedLikeNDArray, lazyproperty
 from .base import BaseTaskBase
 
 
-__all__ = ['Integrate', 'Fold', 'Stack']
+__all__ = ['Integrate', 'Fold', 'MultiFold', 'OnlineFold', 'Stack', 'Gate',
+           'fold_parallel',
+           'evaluate_phase', 'phase_grid']
 
 
 class _FakeOutput(ShapedLikeNDArray):
@@ -47,6 +50,134 @@ def is_index(n):
         return True
 
 
+def _check_count_dtype(offsets, count_dtype):
+    """Check that counts can be stored without overflowing.
+
+    No bin can be filled with more samples than lie between the edges of the
+    output sample it belongs to, so it suffices to check the largest
+    difference between consecutive offsets.  This also holds if partial
+    counts for an output sample are added together later.
+
+    Raises
+    ------
+    OverflowError
+        If the count type cannot hold the largest possible count.
+    """
+    max_count = np.diff(offsets).max(initial=0)
+    if max_count > np.iinfo(count_dtype).max:
+        raise OverflowError("up to {} samples may be added in a bin, which "
+                            "does not fit in a count of type {}; pass in a "
+                            "structured dtype with a larger 'count' type."
+                            .format(max_count, np.dtype(count_dtype)))
+
+
+def evaluate_phase(phase, time, offsets, sample_rate, tolerance=None):
+    """Evaluate phases at offsets from a given time.
+
+    Calculates ``phase(time + offsets / sample_rate)``, either directly, or,
+    if a tolerance is given, by linear interpolation between phases
+    calculated on a coarse grid of offsets.  The grid spacing is halved
+    until the interpolated phases halfway between grid points differ from
+    the real ones by less than the tolerance (which guarantees the error
+    bound for phases that are locally quadratic in time).
+
+    Parameters
+    ----------
+    phase : callable
+        Should return pulse phases for given input time(s), as an
+        `~astropy.units.Quantity` with angular units or a
+        `~scintillometry.phases.Phase` instance.
+    time : `~astropy.time.Time`
+        Reference time.
+    offsets : array of float
+        Sample offsets relative to the reference time at which phases are
+        required.  Should be one-dimensional.
+    sample_rate : `~astropy.units.Quantity`
+        Rate of the samples.
+    tolerance : `~astropy.units.Quantity` or float, optional
+        Maximum error allowed for the interpolation, with angular units or as
+        a float in units of cycles.  Default: `None`, which implies direct
+        calculation.
+
+    Returns
+    -------
+    phase : `~astropy.units.Quantity` or `~scintillometry.phases.Phase`
+        Phases at the requested offsets.  The interpolation is done relative
+        to the phase at the first grid point, so that no precision is lost
+        for large cycle counts.  Phases are exact at the grid points.
+    """
+    if tolerance is None or len(offsets) <= 3:
+        return phase(time + offsets / sample_rate)
+
+    tolerance = u.Quantity(tolerance, u.cycle).to_value(u.cycle)
+    result = phase_grid(phase, time, offsets.min(), offsets.max(),
+                        sample_rate, tolerance, max_points=len(offsets) - 1)
+    if result is None:
+        # Grid would become as fine as the requested offsets.
+        return phase(time + offsets / sample_rate)
+
+    grid, grid_value, phase0 = result
+    return phase0 + np.interp(offsets, grid, grid_value) * u.cycle
+
+
+def phase_grid(phase, time, start, stop, sample_rate, tolerance,
+               max_points, reference=None, unit=u.cycle):
+    """Calculate phases on a grid suitable for linear interpolation.
+
+    The grid of offsets initially consists of just ``start`` and ``stop``,
+    and its spacing is halved until phases linearly interpolated to halfway
+    between grid points differ from the real ones by less than the tolerance.
+
+    Parameters
+    ----------
+    phase : callable
+        Should return pulse phases for given input time(s).
+    time : `~astropy.time.Time`
+        Reference time.
+    start, stop : float
+        Sample offsets relative to the reference time between which phases
+        are required.
+    sample_rate : `~astropy.units.Quantity`
+        Rate of the samples.
+    tolerance : float
+        Maximum interpolation error allowed, in units of ``unit``.
+    max_points : int
+        Maximum number of grid points.  If the tolerance cannot be reached
+        with fewer points, `None` is returned.
+    reference : `~astropy.units.Quantity` or `~scintillometry.phases.Phase`
+        Reference phase which is subtracted.  Default: phase at ``start``.
+    unit : `~astropy.units.Unit`
+        Unit in which to return phases.  Default: cycles.
+
+    Returns
+    -------
+    grid : `~numpy.ndarray`
+        Sample offsets of the grid points.
+    grid_value : `~numpy.ndarray`
+        Phases minus the reference phase at the grid points, as float.
+    reference : `~astropy.units.Quantity` or `~scintillometry.phases.Phase`
+        Reference phase.
+    """
+    grid = np.array([start, stop], dtype=float)
+    grid_phase = phase(time + grid / sample_rate)
+    if reference is None:
+        reference = grid_phase[0]
+    grid_value = (grid_phase - reference).to_value(unit)
+    while 2 * len(grid) - 1 <= max_points:
+        mid = 0.5 * (grid[:-1] + grid[1:])
+        mid_value = (phase(time + mid / sample_rate) -
+                     reference).to_value(unit)
+        error = mid_value - 0.5 * (grid_value[:-1] + grid_value[1:])
+        # Merge the midpoints into the grid.
+        grid = np.insert(grid, np.arange(1, len(grid)), mid)
+        grid_value = np.insert(grid_value, np.arange(1, len(grid_value)),
+                               mid_value)
+        if np.all(np.abs(error) <= tolerance):
+            return grid, grid_value, reference
+
+    return None
+
+
 class Integrate(BaseTaskBase):
     """Integrate a stream stepwise.
 
@@ -82,6 +213,13 @@ class Integrate(BaseTaskBase):
         stream is good enough, but can be used to increase precision.  Note
         that if ``average=True``, it is the user's responsibilty to pass in
         a structured dtype.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        If given, phases are not calculated for every requested time, but
+        interpolated between phases calculated on a coarse grid, such that
+        the interpolation error is less than the given tolerance (as angle or
+        float in units of cycles).  See
+        `~scintillometry.integration.evaluate_phase`.  Default: `None`, i.e.,
+        calculate all phases directly.
 
     Notes
     -----
@@ -92,12 +230,23 @@ class Integrate(BaseTaskBase):
     for ``average=True``, the sums have been divided by these counts, with bins
     with no points set to ``NaN``.  For ``average=False``, the arrays returned
     by ``read`` are structured arrays with ``data`` and ``count`` fields.
+    By default, the counts are stored using the smallest integer type that
+    can safely hold them.
+
+    For integration over phase, the offsets in the underlying stream that
+    correspond to given phases are found by interpolating in a table of
+    phases calculated for the underlying stream, which is built up as needed
+    in blocks of ``2**20`` samples.  Hence, the phase callable is only called
+    for a few offsets per block.
 
     .. warning: The format for ``average=False`` may change in the future.
 
     """
+    _phase_block_size = 2**20
+
     def __init__(self, ih, step=None, phase=None, *,
-                 start=0, average=True, samples_per_frame=1, dtype=None):
+                 start=0, average=True, samples_per_frame=1, dtype=None,
+                 phase_tolerance=None):
         ih_start = ih.seek(start)
         ih_n_sample = ih.shape[0] - ih_start
         if ih_start < 0 or ih_n_sample < 0:
@@ -115,6 +264,9 @@ class Integrate(BaseTaskBase):
             shape = (ih_n_sample // step,) + ih.sample_shape
             # Initialize values for _get_offsets.
             self._mean_offset_size = 1. / step
+            # Number of samples per bin, used for the fast path in
+            # _read_frame.
+            self._n_step = operator.index(step)
 
         else:
             try:
@@ -130,23 +282,38 @@ class Integrate(BaseTaskBase):
 
             sample_rate = 1. / step
             n_sample = ((stop - start) / step).to_value(u.one)
+            self._n_step = None
             shape = (int(n_sample),) + ih.sample_shape
             # Initialize values for _get_offsets.
             self._mean_offset_size = n_sample / ih_n_sample
             self._start = start
 
+        # Store counts with the smallest (signed) integer type that can hold
+        # them, leaving a margin for bins with more than the average number.
+        # For safety, _accumulate checks the actual maximum possible count.
+        count_dtype = np.min_scalar_type(
+            -2 * int(np.ceil(1. / self._mean_offset_size)) - 1)
         if dtype is None:
             if average:
                 dtype = ih.dtype
             else:
-                dtype = np.dtype([('data', ih.dtype), ('count', int)])
+                dtype = np.dtype([('data', ih.dtype), ('count', count_dtype)])
+        else:
+            dtype = np.dtype(dtype)
+            if dtype.names is not None:
+                count_dtype = dtype['count']
 
         super().__init__(ih, shape=shape, sample_rate=sample_rate,
                          samples_per_frame=samples_per_frame,
                          start_time=start_time, dtype=dtype)
         self.average = average
+        self._count_dtype = count_dtype
         self._phase = phase
         self._ih_start = ih_start
+        self.phase_tolerance = phase_tolerance
+        if phase is not None:
+            self._phase_unit = (1. / self.sample_rate).unit
+            self._phase_table = {}
 
     def _ih_time(self, offset):
         """Get time in underlying stream for given offset.
@@ -185,13 +352,13 @@ class Integrate(BaseTaskBase):
         raw_stop = self._get_offsets(self.shape[0])
         return self._ih_time(raw_stop)
 
-    def _get_offsets(self, samples, precision=1.e-3, max_iter=10):
+    def _get_offsets(self, samples, precision=1.e-3):
         """Get offsets in the underlying stream nearest to samples.
 
-        For a phase callable, this is done by iteratively guessing offsets,
-        calculating their associated phase, and updating, until the change
-        in guessed offset is less than ``precision`` or more than ``max_iter``
-        iterations are done.
+        For a phase callable, this is done by interpolating in a table of
+        phase as a function of offset in the underlying stream, which is
+        built lazily in blocks (see ``_phase_block``).  The table is such
+        that offsets are accurate to within ``precision``.
 
         Phase is assumed to increase monotonously with time.
         """
@@ -202,87 +369,161 @@ class Integrate(BaseTaskBase):
         # Requested phases relative to start (we work relative to the start
         # to avoid rounding errors for large cycle counts).  Also, we want
         # *not* to use the Phase class, as it makes interpolation tricky.
-        phase = np.ravel(samples) / self.sample_rate
-        # Initial guesses for the associated offsets.
-        ih_mean_phase_size = self._mean_offset_size / self.sample_rate
-        offsets = (phase / ih_mean_phase_size).to_value(u.one)
-        # In order to update guesses, below we interpolate phase in offset.
-        # Add known boundaries to ensure we do not go out of bounds there.
-        all_offsets = np.hstack((0, offsets, self.ih.shape[0] - self._ih_start))
-        # Associated phases relative to start phase;
-        # all but start (=0) and stop will be overwritten.
-        all_ih_phase = all_offsets * ih_mean_phase_size
-        # Add in base offset in underlying file.
-        all_offsets += self._ih_start
-        # Select the parts we are going to modify (in-place).
-        offsets = all_offsets[1:-1]
-        ih_phase = all_ih_phase[1:-1]
-        mask = np.ones(offsets.shape, bool)
-        it = 0
-        while np.any(mask) and it < max_iter:
-            # Use mask to avoid calculating more phases than necessary.
-            # First calculate phase associate with the current offset guesses.
-            old_offsets = offsets[mask]
-            ih_time = self.ih.start_time + old_offsets / self.ih.sample_rate
-            # TODO: the conversion is necessary because Quantity(Phase)
-            # doesn't convert the two doubles to float internally.
-            ih_phase[mask] = (self._phase(ih_time) -
-                              self._start).astype(ih_phase.dtype, copy=False)
-            # Next, interpolate in known phases to get improved offsets.
-            offsets[mask] = np.interp(phase[mask], all_ih_phase, all_offsets)
-            # Finally, update mask.
-            mask[mask] = abs(offsets[mask] - old_offsets) > precision
-            it += 1
-
-        if it >= max_iter:  # pragma: no cover
-            warnings.warn('offset calculation did not converge. '
-                          'This should not happen!')
+        phase = (np.ravel(samples) / self.sample_rate).to_value(
+            self._phase_unit)
+        # Initial guesses for the table blocks the phases should be in.
+        ih_mean_phase_size = (self._mean_offset_size /
+                              self.sample_rate).to_value(self._phase_unit)
+        guess = phase / ih_mean_phase_size + self._ih_start
+        n_block = -(-self.ih.shape[0] // self._phase_block_size)
+        block = np.clip(guess // self._phase_block_size,
+                        0, n_block - 1).astype(int)
+        offsets = np.zeros(phase.shape)
+        todo = np.ones(phase.shape, bool)
+        while np.any(todo):
+            for b in np.unique(block[todo]):
+                grid, grid_phase = self._phase_block(b, precision)
+                in_block = todo & (block == b)
+                # Move phases outside the block to the previous or next one,
+                # unless we are at the start or end of the stream (where
+                # interpolation will just give the boundary).
+                below = in_block & (phase < grid_phase[0]) & (b > 0)
+                above = (in_block & (phase > grid_phase[-1]) &
+                         (b < n_block - 1))
+                block[below] -= 1
+                block[above] += 1
+                in_block &= ~(below | above)
+                offsets[in_block] = np.interp(phase[in_block],
+                                              grid_phase, grid)
+                todo &= ~in_block
 
         shape = getattr(samples, 'shape', ())
         return offsets.round().astype(int).reshape(shape)
 
+    def _phase_block(self, block, precision=1.e-3):
+        """Get offsets and associated phases for a block of the table.
+
+        The phases are relative to the start phase, and calculated on a grid
+        on which linear interpolation gives phases to within a given tolerance
+        (see `~scintillometry.integration.phase_grid`).  By default, this is
+        the phase corresponding to ``precision`` samples, but it can be set
+        with the ``phase_tolerance`` argument on initialization.
+        """
+        try:
+            return self._phase_table[block]
+        except KeyError:
+            pass
+
+        start = block * self._phase_block_size
+        stop = min(start + self._phase_block_size, self.ih.shape[0])
+        if self.phase_tolerance is None:
+            tolerance = precision * (self._mean_offset_size /
+                                     self.sample_rate).to_value(
+                                         self._phase_unit)
+        else:
+            tolerance = u.Quantity(self.phase_tolerance,
+                                   u.cycle).to_value(self._phase_unit)
+        result = phase_grid(self._phase, self.ih.start_time, start, stop,
+                            self.ih.sample_rate, tolerance,
+                            max_points=stop - start + 1,
+                            reference=self._start, unit=self._phase_unit)
+        if result is None:
+            # Grid would be as fine as the samples: just use those.
+            grid = np.arange(start, stop + 1.)
+            grid_phase = (self._phase(self.ih.start_time +
+                                      grid / self.ih.sample_rate) -
+                          self._start).to_value(self._phase_unit)
+        else:
+            grid, grid_phase, _ = result
+
+        self._phase_table[block] = grid, grid_phase
+        return grid, grid_phase
+
     def _read_frame(self, frame_index):
         """Determine which samples to read, and integrate over them.
 
         Uses the a ``_get_offsets`` method to determine where in the underlying
-        stream the samples should be gotten from.
-
-        Integration is done by setting up a fake output array whose setter
-        calls back to the ``_integrate`` method that does the actual summing.
+        stream the samples should be gotten from, and ``_accumulate`` to do
+        the actual integration.
         """
+        if self._n_step is not None:
+            return self._read_frame_n_step(frame_index)
+
         # Get offsets in the underlying stream for the current samples (and
         # the next one to get the upper edge). For integration over time
         # intervals, these offsets are not necessarily evenly spaced.
         samples = (frame_index * self.samples_per_frame +
                    np.arange(self.samples_per_frame + 1))
         offsets = self._get_offsets(samples)
+        # Set up real output and an accumulator for use in self._integrate.
+        # Counts are the same for all elements of a sample, so are kept with
+        # size 1 on the sample axes, and only expanded at the end.
+        frame = np.zeros((self.samples_per_frame,) + self.sample_shape,
+                         dtype=self.dtype)
+        ndim_ih_sample = len(self.ih.sample_shape)
+        accumulator = {
+            'data': frame if self.average else frame['data'],
+            'count': np.zeros(frame.shape[:frame.ndim-ndim_ih_sample] +
+                              (1,) * ndim_ih_sample, dtype=self._count_dtype)}
+        self._accumulate(accumulator, offsets)
+        if self.average:
+            frame /= accumulator['count']
+        else:
+            frame['count'] = accumulator['count']
+
+        return frame
+
+    def _read_frame_n_step(self, frame_index):
+        """Integrate a fixed number of samples per bin.
+
+        Since all bins contain the same number of samples, the whole frame
+        can be read in one go, and summed after reshaping, with the count
+        just a constant.
+        """
+        n_step = self._n_step
+        self.ih.seek(self._get_offsets(frame_index * self.samples_per_frame))
+        raw = self.ih.read(self.samples_per_frame * n_step)
+        raw = raw.reshape((self.samples_per_frame, n_step) +
+                          self.ih.sample_shape)
+        frame = np.empty((self.samples_per_frame,) + self.sample_shape,
+                         dtype=self.dtype)
+        if self.average:
+            np.sum(raw, axis=1, out=frame)
+            frame /= n_step
+        else:
+            np.sum(raw, axis=1, out=frame['data'])
+            frame['count'] = n_step
+
+        return frame
+
+    def _accumulate(self, accumulator, offsets):
+        """Add samples from the underlying stream to an accumulator.
+
+        Integration is done by setting up a fake output array whose setter
+        calls back to the ``_integrate`` method that does the actual summing.
+
+        Parameters
+        ----------
+        accumulator : `~numpy.ndarray` or dict
+            Structured array or dict holding ``'data'`` and ``'count'``, with
+            ``len(offsets) - 1`` samples.
+        offsets : `~numpy.ndarray`
+            Offsets in the underlying stream of the edges of the samples.
+        """
+        _check_count_dtype(offsets, self._count_dtype)
         self.ih.seek(offsets[0])
-        offsets -= offsets[0]
+        offsets = offsets - offsets[0]
         # Set up fake output with a shape that tells the reader of the
         # underlying stream how many samples should be read (and a remaining
         # part that should pass consistency checks), and which has a callback
         # for the actual setting of output in the reader.
         integrating_out = _FakeOutput((offsets[-1],) + self.ih.sample_shape,
                                       setitem=self._integrate)
-        # Set up real output and store information used in self._integrate
-        frame = np.zeros((self.samples_per_frame,) + self.sample_shape,
-                         dtype=self.dtype)
-        if self.average:
-            ndim_ih_sample = len(self.ih.sample_shape)
-            self._frame = {
-                'data': frame,
-                'count': np.zeros(frame.shape[:-ndim_ih_sample] +
-                                  (1,) * ndim_ih_sample, dtype=int)}
-        else:
-            self._frame = frame
+        # Store information used in self._integrate.
+        self._frame = accumulator
         self._offsets = offsets
-
         # Do the actual reading.
         self.ih.read(out=integrating_out)
-        if self.average:
-            frame /= self._frame['count']
-
-        return frame
 
     def _integrate(self, item, data):
         """Sum data in the correct samples.
@@ -350,6 +591,19 @@ class Fold(Integrate):
         stream is good enough, but can be used to increase precision.  Note
         that if ``average=True``, it is the user's responsibilty to pass in
         a structured dtype.
+    method : {'bincount', 'add.at'}, optional
+        How to add the samples to the phase bins.  The default, 'bincount',
+        linearizes the sample, phase-bin and sample-shape indices and
+        accumulates with a single call to `~numpy.bincount`.  With 'add.at',
+        `numpy.ufunc.at` is used, which is much slower, but does not create
+        any temporary index or sum arrays.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        If given, phases are not calculated for every sample, but interpolated
+        between phases calculated on a coarse grid, such that the
+        interpolation error is less than the given tolerance (as angle or
+        float in units of cycles).  See
+        `~scintillometry.integration.evaluate_phase`.  Default: `None`, i.e.,
+        calculate all phases directly.
 
     See Also
     --------
@@ -363,44 +617,500 @@ class Fold(Integrate):
     and for ``average=True``, the sums have been divided by these counts, with
     bins with no points set to ``NaN``.  For ``average=False``, the arrays
     returned by ``read`` are structured arrays with ``data`` and ``count``
-    fields.
+    fields, with counts stored using the smallest integer type that can
+    safely hold them.
 
     .. warning: The format for ``average=False`` may change in the future.
 
     """
     def __init__(self, ih, n_phase, phase, step=None, *,
-                 start=0, average=True, samples_per_frame=1, dtype=None):
+                 start=0, average=True, samples_per_frame=1, dtype=None,
+                 method='bincount', phase_tolerance=None):
+        if method not in ('bincount', 'add.at'):
+            raise ValueError("method should be one of 'bincount' or "
+                             "'add.at'.")
         super().__init__(ih, step=step, start=start, average=average,
-                         samples_per_frame=samples_per_frame)
+                         samples_per_frame=samples_per_frame, dtype=dtype,
+                         phase_tolerance=phase_tolerance)
+        # Folding always needs the general integration machinery.
+        self._n_step = None
         # And ensure we reshape it to cycles.
         self._shape = (self._shape[0], n_phase) + ih.sample_shape
         self.n_phase = n_phase
         self.phase = phase
+        self.method = method
 
-    def _read_frame(self, frame_index):
+    def _accumulate(self, accumulator, offsets):
         # Before calling the underlying implementation, get the start time in
-        # the underlying frame, to be used to calculate phases in _integrate.
-        offset0 = self._get_offsets(frame_index * self.samples_per_frame)
-        self.ih.seek(offset0)
+        # the underlying stream, to be used to calculate phases in _integrate.
+        self.ih.seek(offsets[0])
         self._raw_time = self.ih.time
-        return super()._read_frame(frame_index)
+        return super()._accumulate(accumulator, offsets)
 
     def _integrate(self, item, raw):
         # Get sample and phase indices.
         raw_items = np.arange(item.start, item.stop)
-        if self.samples_per_frame == 1:
-            sample_index = 0
+        sample_index = self._sample_index(raw_items)
+        phase_index = self._phase_index(self.phase, self.n_phase, raw_items)
+        # Do the actual folding, adding the data to the sums and counts.
+        self._add(sample_index, phase_index, raw)
+
+    def _sample_index(self, raw_items):
+        """Get the index of the output sample for raw items in a frame."""
+        if len(self._offsets) == 2:
+            return 0
         else:
-            sample_index = np.searchsorted(self._offsets[1:], raw_items)
+            return np.searchsorted(self._offsets[1:], raw_items, side='right')
 
+    def _phase_index(self, phase, n_phase, raw_items):
+        """Get phase bin indices for raw items in a frame."""
         # TODO: allow having a phase reference.
-        phases = self.phase(self._raw_time + raw_items / self.ih.sample_rate)
-        phase_index = ((phases % (1. * u.cycle)).to_value(u.cycle) *
-                       self.n_phase).astype(int)
-        # Do the actual folding, adding the data to the sums and counts.
-        # TODO: np.add.at is not very efficient; replace?
-        np.add.at(self._frame['data'], (sample_index, phase_index), raw)
-        np.add.at(self._frame['count'], (sample_index, phase_index), 1)
+        phases = evaluate_phase(phase, self._raw_time, raw_items,
+                                self.ih.sample_rate, self.phase_tolerance)
+        return ((phases % (1. * u.cycle)).to_value(u.cycle) *
+                n_phase).astype(int)
+
+    def _add(self, sample_index, phase_index, raw):
+        """Add raw data to the sums and counts of the given bins."""
+        if self.method == 'add.at':
+            np.add.at(self._frame['data'], (sample_index, phase_index), raw)
+            np.add.at(self._frame['count'], (sample_index, phase_index), 1)
+            return
+
+        # Linearize the output sample and phase indices, and count.
+        n_bin = (len(self._offsets) - 1) * self.n_phase
+        index = sample_index * self.n_phase + phase_index
+        count = self._frame['count']
+        count += np.bincount(index, minlength=n_bin).reshape(
+            count.shape[:2] + (1,) * (count.ndim - 2))
+        # For the data, also linearize the sample-shape index, viewing complex
+        # data as pairs of reals since bincount only handles real weights.
+        data = self._frame['data']
+        raw = np.ascontiguousarray(raw).reshape(len(raw), -1)
+        if raw.dtype.kind == 'c':
+            raw = raw.view(raw.real.dtype)
+        n_item = raw.shape[1]
+        index = (index[:, np.newaxis] * n_item + np.arange(n_item)).ravel()
+        result = np.bincount(index, weights=raw.ravel(),
+                             minlength=n_bin * n_item)
+        if data.dtype.kind == 'c':
+            result = result.view('c16')
+        data += result.reshape(data.shape).astype(data.dtype, copy=False)
+
+
+class MultiFold(Fold):
+    """Fold pulse profiles of several pulsars in a single pass.
+
+    Reads the underlying stream only once, adding each sample to the
+    profiles of all pulsars.  Profiles are concatenated along the phase
+    axis, i.e., the output sample shape is ``(sum(n_phase),) +
+    ih.sample_shape``; use `~scintillometry.integration.MultiFold.split` to
+    get the profiles of the separate pulsars.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    n_phase : sequence of int
+        Number of bins per pulse period for each pulsar.
+    phase : sequence of callable
+        For each pulsar, a callable that returns pulse phases for given
+        input time(s).  See `~scintillometry.integration.Fold`.
+    step : int or `~astropy.units.Quantity`, optional
+        Number of input samples or time interval over which to fold.
+        If not given, the whole file will be folded into a single profile.
+    start : `~astropy.time.Time` or int, optional
+        Time or offset at which to start the integration. If an offset or if
+        ``step`` is integer, the actual start time will the underlying sample
+        time nearest to the requested one.  Default: 0 (start of stream).
+    average : bool, optional
+        Whether the output pulse profile should be the average of all entries
+        that contributed to it, or rather the sum, in a structured array that
+        holds both ``'data'`` and ``'count'`` items.
+    samples_per_frame : int, optional
+        Number of sample times to process in one go.  This can be used to
+        optimize the process, though in general the default of 1 should work.
+    dtype : `~numpy.dtype`, optional
+        Output dtype.  Generally, the default of the dtype of the underlying
+        stream is good enough, but can be used to increase precision.
+    method : {'bincount', 'add.at'}, optional
+        How to add the samples to the phase bins.  See
+        `~scintillometry.integration.Fold`.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        Tolerance for interpolating phases.  See
+        `~scintillometry.integration.Fold`.
+
+    See Also
+    --------
+    Fold : to fold a single pulsar
+    """
+    def __init__(self, ih, n_phase, phase, step=None, *,
+                 start=0, average=True, samples_per_frame=1, dtype=None,
+                 method='bincount', phase_tolerance=None):
+        n_phases = tuple(operator.index(n) for n in n_phase)
+        phases = tuple(phase)
+        if len(n_phases) != len(phases):
+            raise ValueError("need the same number of n_phase and phase.")
+        super().__init__(ih, sum(n_phases), phases, step=step, start=start,
+                         average=average, samples_per_frame=samples_per_frame,
+                         dtype=dtype, method=method,
+                         phase_tolerance=phase_tolerance)
+        self.n_phases = n_phases
+        self._bin_offsets = np.cumsum((0,) + n_phases)
+
+    def _integrate(self, item, raw):
+        raw_items = np.arange(item.start, item.stop)
+        sample_index = self._sample_index(raw_items)
+        for phase, n_phase, bin_offset in zip(self.phase, self.n_phases,
+                                              self._bin_offsets):
+            phase_index = self._phase_index(phase, n_phase, raw_items)
+            self._add(sample_index, bin_offset + phase_index, raw)
+
+    def split(self, data):
+        """Split output data into the profiles of the separate pulsars.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            Data read from this task.
+
+        Returns
+        -------
+        profiles : list of `~numpy.ndarray`
+            Views of the profiles for each pulsar.
+        """
+        return np.split(data, self._bin_offsets[1:-1], axis=1)
+
+
+class OnlineFold:
+    """Fold pulse profiles incrementally, as data arrive.
+
+    Unlike `~scintillometry.integration.Fold`, which determines its shape
+    from the underlying stream at initialization, this keeps accumulators
+    that are updated with whatever new data have become available in the
+    stream each time `~scintillometry.integration.OnlineFold.update` is
+    called.  The cost of an update is proportional to the amount of new
+    data only.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    n_phase : int
+        Number of bins per pulse period.
+    phase : callable
+        Should return pulse phases for given input time(s).  See
+        `~scintillometry.integration.Fold`.
+    step : int or `~astropy.units.Quantity`, optional
+        Number of input samples or time interval over which to fold.
+        If not given, all data will be folded into a single profile.
+    start : `~astropy.time.Time` or int, optional
+        Time or offset at which to start folding.  Default: 0 (start of
+        stream).
+    average : bool, optional
+        Whether `~scintillometry.integration.OnlineFold.profiles` should
+        return the average of all entries that contributed to each bin, or
+        rather the sum, in a structured array that holds both ``'data'`` and
+        ``'count'`` items.
+    dtype : `~numpy.dtype`, optional
+        Data type of the sums.  Default: that of the underlying stream.
+    method : {'bincount', 'add.at'}, optional
+        How to add the samples to the phase bins.  See
+        `~scintillometry.integration.Fold`.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        Tolerance for interpolating phases.  See
+        `~scintillometry.integration.Fold`.
+
+    Examples
+    --------
+    For a stream that grows as data are taken, one would do::
+
+        >>> of = OnlineFold(fh, 256, phase, 10. * u.s)  # doctest: +SKIP
+        >>> while taking_data:  # doctest: +SKIP
+        ...     of.update()
+        ...     show(of.profiles[:of.n_complete])
+
+    If the stream has to be reopened to see new data, the new stream can be
+    passed on to ``update``.
+
+    Notes
+    -----
+    The folding itself is done by a single, non-averaging
+    `~scintillometry.integration.Fold`, which is pointed at the latest
+    stream on each update.  Since a ``Fold`` needs at least one complete
+    ``step`` to be initialized, nothing is folded until the stream holds
+    that much data.  Counts are stored with the same compact integer type
+    a ``Fold`` uses, except if all data are folded into a single profile,
+    since then the number of samples is not bounded.
+    """
+    def __init__(self, ih, n_phase, phase, step=None, *, start=0,
+                 average=True, dtype=None, method='bincount',
+                 phase_tolerance=None):
+        if method not in ('bincount', 'add.at'):
+            raise ValueError("method should be one of 'bincount' or "
+                             "'add.at'.")
+        ih_start = ih.seek(start)
+        if ih_start < 0 or ih_start > ih.shape[0]:
+            raise ValueError("'start' is not within the underlying stream.")
+        self.ih = ih
+        self.n_phase = n_phase
+        self.phase = phase
+        self.step = step
+        self.start = start
+        self.average = average
+        self.dtype = dtype
+        self._kwargs = dict(method=method, phase_tolerance=phase_tolerance)
+        self._fold = None
+        self._offset = ih_start
+        self._n_sample = 0
+        self._result = None
+
+    def _make_fold(self):
+        """Create the Fold doing the work, if there is enough data for it."""
+        n_available = self.ih.shape[0] - self._offset
+        if self.step is None:
+            enough = n_available > 0
+        elif is_index(self.step):
+            enough = n_available >= self.step
+        else:
+            # Allow for a fractional start sample.
+            enough = n_available - 1 >= (self.step *
+                                         self.ih.sample_rate).to_value(u.one)
+        if not enough:
+            return False
+
+        fold = Fold(self.ih, self.n_phase, self.phase, self.step,
+                    start=self.start, average=False, **self._kwargs)
+        data_dtype = fold.dtype['data'] if self.dtype is None else self.dtype
+        # For a single profile, there is no bound to the number of counts.
+        count_dtype = int if self.step is None else fold.dtype['count']
+        self._result = np.zeros(
+            (0,) + fold.sample_shape,
+            dtype=np.dtype([('data', data_dtype), ('count', count_dtype)]))
+        self._offset = int(fold._get_offsets(0))
+        self._fold = fold
+        return True
+
+    @property
+    def n_complete(self):
+        """Number of output samples for which all data have been folded."""
+        if self.step is None or self._fold is None:
+            return 0
+        return int(np.searchsorted(
+            self._fold._get_offsets(np.arange(1, self._n_sample + 1)),
+            self._offset, side='right'))
+
+    @property
+    def profiles(self):
+        """Current profiles, including those still being accumulated."""
+        if self._result is None:
+            return np.zeros((0, self.n_phase) + self.ih.sample_shape,
+                            self.ih.dtype if self.average else
+                            np.dtype([('data', self.ih.dtype),
+                                      ('count', int)]))
+        result = self._result[:self._n_sample]
+        if not self.average:
+            return result.copy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return result['data'] / result['count']
+
+    def update(self, ih=None):
+        """Fold any new data in the underlying stream.
+
+        Parameters
+        ----------
+        ih : task or `baseband` stream reader, optional
+            New handle to the underlying stream, e.g., if it had to be
+            reopened to see new data.
+
+        Returns
+        -------
+        n_new : int
+            Number of new samples from the underlying stream folded.
+        """
+        if ih is not None:
+            self.ih = ih
+            if self._fold is not None:
+                self._fold.ih = ih
+        if self._fold is None and not self._make_fold():
+            return 0
+
+        stop = self.ih.shape[0]
+        if stop <= self._offset:
+            return 0
+
+        fold = self._fold
+        # Find the output samples that overlap with the new data.
+        first = max(self._n_sample - 1, 0)
+        if self.step is None:
+            last = 1
+            offsets = np.array([self._offset, stop])
+        else:
+            # Get offsets for a few samples more than needed, to be sure
+            # the stop of the new data is included.
+            n_guess = int(np.ceil((stop - fold._ih_start) *
+                                  fold._mean_offset_size)) + 1
+            offsets = fold._get_offsets(np.arange(first, n_guess + 1))
+            last = first + int(np.searchsorted(offsets, stop))
+            # Counts are added over updates, so check for the full samples.
+            _check_count_dtype(offsets[:last - first + 1],
+                               self._result.dtype['count'])
+            offsets = np.clip(offsets[:last - first + 1], self._offset, stop)
+        # Ensure the accumulators are large enough, doubling their size if
+        # needed to keep the cost of copying low.
+        if last > len(self._result):
+            result = np.zeros((max(last, 2 * len(self._result)),) +
+                              self._result.shape[1:], self._result.dtype)
+            result[:self._n_sample] = self._result[:self._n_sample]
+            self._result = result
+        fold._accumulate(self._result[first:last], offsets)
+
+        n_new = stop - self._offset
+        self._offset = stop
+        self._n_sample = last
+        return n_new
+
+
+def _fold_chunk(ih_maker, args, kwargs, first, offsets):
+    """Fold part of a stream in a worker (helper for `fold_parallel`).
+
+    Returns the index of the first output sample, and the partial
+    accumulator, a structured array with ``'data'`` and ``'count'``.
+    """
+    with ih_maker() as ih:
+        fold = Fold(ih, *args, average=False, **kwargs)
+        accumulator = np.zeros((len(offsets) - 1,) + fold.sample_shape,
+                               dtype=fold.dtype)
+        fold._accumulate(accumulator, offsets)
+    return first, accumulator
+
+
+def fold_parallel(ih_maker, n_phase, phase, step=None, *, start=0,
+                  average=True, dtype=None, n_chunk=None, executor=None,
+                  **kwargs):
+    """Fold pulse profiles using multiple processes.
+
+    The underlying stream is split in chunks in time, each of which is
+    folded separately in a worker, producing partial sums and counts.  These
+    are merged into the same output as would be produced by reading all
+    samples from `~scintillometry.integration.Fold`.
+
+    Parameters
+    ----------
+    ih_maker : callable
+        Should return the input data stream when called without arguments.
+        It is called in each worker, so should be picklable, e.g., a
+        module-level function or a `functools.partial` of one.  Each stream
+        is closed when it has been used.
+    n_phase : int
+        Number of bins per pulse period.
+    phase : callable
+        Should return pulse phases for given input time(s).  Should be
+        picklable.  See `~scintillometry.integration.Fold`.
+    step : int or `~astropy.units.Quantity`, optional
+        Number of input samples or time interval over which to fold.
+        If not given, the whole file will be folded into a single profile.
+    start : `~astropy.time.Time` or int, optional
+        Time or offset at which to start the integration.
+    average : bool, optional
+        Whether the output pulse profile should be the average of all entries
+        that contributed to it, or rather the sum, in a structured array that
+        holds both ``'data'`` and ``'count'`` items.
+    dtype : `~numpy.dtype`, optional
+        Data type of the sums and of the output.  If not structured, counts
+        are kept with the same integer type `~scintillometry.integration.Fold`
+        would use.  Default: that of the underlying stream.
+    n_chunk : int, optional
+        Number of chunks to split the stream in.  Default: the number of
+        CPUs.
+    executor : `~concurrent.futures.Executor`, optional
+        Executor used to fold the chunks.  It is not shut down, so it can be
+        reused.  Default: a new `~concurrent.futures.ProcessPoolExecutor`,
+        which is shut down when done.
+    **kwargs
+        Further arguments passed on to `~scintillometry.integration.Fold`
+        (not ``samples_per_frame``).
+
+    Returns
+    -------
+    profiles : `~numpy.ndarray`
+        Folded profiles for all output samples.
+
+    Notes
+    -----
+    If there are at least as many output samples as chunks, the chunks are
+    split at sample edges, so that each output sample is calculated by a
+    single worker, giving results identical to those of
+    `~scintillometry.integration.Fold` (with the default 'bincount' method)
+    independent of the number of chunks.  Otherwise, chunks are split at
+    frame boundaries of the underlying stream, and partial sums are added
+    in order.  Counts will still be identical, but sums may differ at the
+    level of the floating point rounding errors.
+    """
+    args = (n_phase, phase, step)
+    kwargs['start'] = start
+    with ih_maker() as ih:
+        fold = Fold(ih, *args, average=False, **kwargs)
+        n_sample = fold.shape[0]
+        edges = fold._get_offsets(np.arange(n_sample + 1))
+        ih_samples_per_frame = ih.samples_per_frame
+
+    # Set up the dtype of the partial sums, ensuring it includes counts.
+    if dtype is None:
+        dtype = fold.dtype
+    else:
+        dtype = np.dtype(dtype)
+        if dtype.names is None:
+            dtype = np.dtype([('data', dtype),
+                              ('count', fold.dtype['count'])])
+    kwargs['dtype'] = dtype
+    # Partial counts of chunks are added, so check for the full samples.
+    _check_count_dtype(edges, dtype['count'])
+    if n_chunk is None:
+        n_chunk = os.cpu_count() or 1
+
+    if n_sample >= n_chunk:
+        chunk_edges = edges[np.linspace(0, n_sample, n_chunk + 1)
+                            .round().astype(int)]
+    else:
+        raw_edges = np.linspace(edges[0], edges[-1], n_chunk + 1)
+        # Align with frames of the underlying stream.
+        chunk_edges = np.unique(np.hstack(
+            (edges[0], (raw_edges[1:-1] // ih_samples_per_frame *
+                        ih_samples_per_frame).astype(int), edges[-1])))
+        chunk_edges = chunk_edges[(chunk_edges >= edges[0]) &
+                                  (chunk_edges <= edges[-1])]
+
+    result = np.zeros(fold.shape, dtype)
+    # Only manage the lifetime of an executor we create ourselves.
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor()
+    try:
+        futures = []
+        for raw_start, raw_stop in zip(chunk_edges[:-1], chunk_edges[1:]):
+            # Output samples that have any overlap with the chunk.
+            first = np.searchsorted(edges[1:], raw_start, side='right')
+            last = np.searchsorted(edges[:-1], raw_stop, side='left')
+            offsets = np.clip(edges[first:last+1], raw_start, raw_stop)
+            futures.append(executor.submit(_fold_chunk, ih_maker, args,
+                                           kwargs, first, offsets))
+
+        for future in futures:
+            first, partial = future.result()
+            sl = slice(first, first + len(partial))
+            result['data'][sl] += partial['data']
+            result['count'][sl] += partial['count']
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    if not average:
+        return result
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (result['data'] /
+                result['count']).astype(dtype['data'])
 
 
 class Stack(BaseTaskBase):
@@ -433,6 +1143,12 @@ class Stack(BaseTaskBase):
         stream is good enough, but can be used to increase precision.  Note
         that if ``average=True``, it is the user's responsibilty to pass in
         a structured dtype.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        If given, phases are interpolated between phases calculated on a
+        coarse grid, such that the interpolation error is less than the given
+        tolerance (as angle or float in units of cycles).  See
+        `~scintillometry.integration.evaluate_phase`.  Default: `None`, i.e.,
+        calculate all phases directly.
 
     See Also
     --------
@@ -454,12 +1170,13 @@ class Stack(BaseTaskBase):
 
     """
     def __init__(self, ih, n_phase, phase, *,
-                 start=0, average=True, samples_per_frame=1, dtype=None):
+                 start=0, average=True, samples_per_frame=1, dtype=None,
+                 phase_tolerance=None):
         # Set up the integration in phase bins.
         phased = Integrate(ih, u.cycle/n_phase, phase,
                            start=start, average=average,
                            samples_per_frame=samples_per_frame*n_phase,
-                           dtype=dtype)
+                           dtype=dtype, phase_tolerance=phase_tolerance)
         # And ensure we reshape it to cycles.
         shape = (phased.shape[0] // n_phase, n_phase) + phased.shape[1:]
         super().__init__(phased, shape=shape,
@@ -469,11 +1186,166 @@ class Stack(BaseTaskBase):
         self.n_phase = n_phase
 
     def _read_frame(self, frame_index):
-        # Read frame in phased directly, bypassing its ``read`` method.
-        out = self.ih._read_frame(frame_index)
+        # Get the phase bin edges in the underlying stream for all pulses in
+        # the frame from phased, but read the raw data directly, bypassing
+        # the reading and integration by pieces of phased.
+        phased = self.ih
+        samples = (frame_index * phased.samples_per_frame +
+                   np.arange(phased.samples_per_frame + 1))
+        offsets = phased._get_offsets(samples)
+        phased.ih.seek(offsets[0])
+        raw = phased.ih.read(offsets[-1] - offsets[0])
+        # Sum all phase bins of all pulses in one go.  Note that reduceat
+        # cannot deal with indices at the end, and for empty bins returns
+        # the element at the index, so those need to be zeroed.
+        count = np.diff(offsets)
+        indices = offsets[:-1] - offsets[0]
+        data_dtype = phased.dtype if phased.average else phased.dtype['data']
+        data = np.add.reduceat(raw.astype(data_dtype, copy=False),
+                               np.minimum(indices, max(len(raw) - 1, 0)))
+        data[count == 0] = 0
+        count = count.reshape((-1,) + (1,) * (data.ndim - 1))
+        if phased.average:
+            data /= count
+            out = data
+        else:
+            out = np.empty(data.shape, phased.dtype)
+            out['data'] = data
+            out['count'] = count
+
         return out.reshape((self.samples_per_frame,) + self.sample_shape)
 
     @property
     def stop_time(self):
         """Time at the end of the output, just after the last sample."""
         return self.ih.stop_time
+
+
+class Gate(BaseTaskBase):
+    """Select the on-pulse part of a stream.
+
+    For each pulse, the samples in a given phase window are selected, and
+    only those are read from the underlying stream.  The output thus is a
+    compacted stream of pulses, with each sample holding the
+    ``n_window`` raw samples starting at the beginning of the window.
+    Hence, further processing, such as squaring and integrating, only has to
+    deal with the on-pulse part of the data.
+
+    Parameters
+    ----------
+    ih : task or `baseband` stream reader
+        Input data stream, with time as the first axis.
+    phase : callable
+        Should return pulse phases for given input time(s), passed in as an
+        '~astropy.time.Time' object.  The output should be an array of float,
+        and has to include the cycle count.
+    window : tuple of float or `~astropy.units.Quantity`
+        Start and stop phase of the on-pulse window, as angles or floats in
+        units of cycles.  The start may be negative, e.g., ``(-0.05, 0.05)``
+        for a window centred on phase 0.
+    n_window : int, optional
+        Number of raw samples to select for each pulse.  By default, the
+        number needed to cover the window given the mean pulse period.
+    start : `~astropy.time.Time` or int, optional
+        Time or offset at which to start looking for pulses.  Default: 0
+        (start of stream).
+    samples_per_frame : int, optional
+        Number of pulses to process in one go.  Default: 1.
+    phase_tolerance : `~astropy.units.Quantity` or float, optional
+        If given, phases are interpolated between phases calculated on a
+        coarse grid, such that the interpolation error is less than the given
+        tolerance (as angle or float in units of cycles).  See
+        `~scintillometry.integration.evaluate_phase`.  Default: `None`, i.e.,
+        calculate all phases directly.
+
+    Notes
+    -----
+    The output has shape ``(n_pulse, n_window) + ih.sample_shape``, with a
+    sample rate in units of inverse cycles, like for
+    `~scintillometry.integration.Stack`.  The offsets in the underlying
+    stream and the times of the first sample of each window are available as
+    ``window_offsets`` and ``window_times``.
+
+    """
+    def __init__(self, ih, phase, window, *, n_window=None, start=0,
+                 samples_per_frame=1, phase_tolerance=None):
+        window = u.Quantity(window, u.cycle).to_value(u.cycle)
+        if window.shape != (2,) or not 0 < window[1] - window[0] <= 1:
+            raise ValueError("'window' should consist of a start and stop "
+                             "phase, less than a cycle apart.")
+        # Use integration over cycles to find offsets for given phases.
+        phased = Integrate(ih, u.cycle, phase, start=start,
+                           phase_tolerance=phase_tolerance)
+        # Phase of the first window relative to the start phase.
+        offset = phased._start - window[0] * u.cycle
+        offset = offset - np.round(offset.to_value(u.cycle)) * u.cycle
+        self._window_start = -offset.to_value(u.cycle) % 1
+        if n_window is None:
+            n_window = int(np.ceil((window[1] - window[0]) /
+                                   phased._mean_offset_size))
+        # Number of windows that fit, ignoring a last one that only just
+        # does not fit due to rounding.
+        n_cycle = phased._mean_offset_size * (ih.shape[0] - phased._ih_start)
+        n_pulse = max(int(np.floor(n_cycle - self._window_start -
+                                   (window[1] - window[0]))) + 1, 0)
+        while (n_pulse > 0 and ih.shape[0] < n_window + phased._get_offsets(
+                n_pulse - 1 + self._window_start)):
+            n_pulse -= 1
+        n_pulse -= n_pulse % samples_per_frame
+        if n_pulse == 0:
+            raise ValueError("stream does not contain any full windows.")
+        self._phased = phased
+        self.n_window = n_window
+        self.window = window
+        start_time = (ih.start_time + phased._get_offsets(
+            self._window_start) / ih.sample_rate)
+        super().__init__(ih, shape=(n_pulse, n_window) + ih.sample_shape,
+                         sample_rate=phased.sample_rate,
+                         samples_per_frame=samples_per_frame,
+                         start_time=start_time)
+
+    def _get_offsets(self, samples):
+        """Get offsets in the underlying stream of window starts."""
+        return self._phased._get_offsets(samples + self._window_start)
+
+    @lazyproperty
+    def window_offsets(self):
+        """Offsets in the underlying stream of the start of each window."""
+        return self._get_offsets(np.arange(self.shape[0]))
+
+    @lazyproperty
+    def window_times(self):
+        """Times of the first samples of each window."""
+        return (self.ih.start_time +
+                self.window_offsets / self.ih.sample_rate)
+
+    @property
+    def time(self):
+        """Time of the first sample of the window at the current offset."""
+        offset = self.tell()
+        if offset == self.shape[0]:
+            return self.stop_time
+        return self.window_times[offset]
+
+    @property
+    def stop_time(self):
+        """Time just after the last sample of the last window."""
+        return self.window_times[-1] + self.n_window / self.ih.sample_rate
+
+    def _read_frame(self, frame_index):
+        # Read only the windows from the underlying stream.
+        offsets = self._get_offsets(frame_index * self.samples_per_frame +
+                                    np.arange(self.samples_per_frame))
+        frame = np.empty((self.samples_per_frame,) + self.sample_shape,
+                         self.dtype)
+        # Windows that overlap or touch are read in a single go; for the
+        # others, the data in between are skipped.
+        breaks = np.nonzero(offsets[1:] > offsets[:-1] + self.n_window)[0]
+        window = np.arange(self.n_window)
+        for run in np.split(np.arange(len(offsets)), breaks + 1):
+            run_start = offsets[run[0]]
+            self.ih.seek(run_start)
+            raw = self.ih.read(offsets[run[-1]] + self.n_window - run_start)
+            frame[run] = raw[(offsets[run, np.newaxis] - run_start) + window]
+
+        return frame
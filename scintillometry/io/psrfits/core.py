@@ -1,6 +1,8 @@
 # Licensed under the GPLv3 - see LICENSE
 """Interfaces for dealing with PSRFITS fold-mode data."""
 
+import numpy as np
+
 from ...base import BaseTaskBase
 from astropy.io import fits
 from .hdu import HDU_map
@@ -141,8 +143,39 @@ class PSRFITSReader(BaseTaskBase):
         super().__init__(ih, frequency=frequency, sideband=sideband,
                          polarization=polarization, dtype=dtype)
 
+    def read(self, count=None, out=None):
+        """Read a number of complete samples.
+
+        Since each row of fold-mode data is one sample, all requested rows
+        are decoded in one go directly into the output array.
+
+        Parameters
+        ----------
+        count : int or None, optional
+            Number of complete samples to read.  If `None` (default) or
+            negative, the whole remainder of the file is read.  Ignored if
+            ``out`` is given.
+        out : None or array, optional
+            Array to store the output in. If given, ``count`` will be inferred
+            from the first dimension; the other dimension should equal
+            `sample_shape`.
+
+        Returns
+        -------
+        out : `~numpy.ndarray` of float
+            The first dimension is sample-time, and the remainder given by
+            `sample_shape`.
+        """
+        out = self._get_read_output(count, out)
+        count = out.shape[0]
+        self.ih.read_data_rows(self.offset, self.offset + count,
+                               weighted=self.weighted, out=out)
+        self.offset += count
+        return out
+
     def _read_frame(self, frame_index):
-        res = self.ih.read_data_row(frame_index, weighted=self.weighted).T
+        res = self.ih.read_data_rows(frame_index, frame_index + 1,
+                                     weighted=self.weighted)
         return res.reshape((self.samples_per_frame, ) + self.sample_shape)
 
     def close(self):
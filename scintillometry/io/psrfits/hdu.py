@@ -214,27 +214,72 @@ class SubintHDU(HDUWrapper):
 
     @lazyproperty
     def dtype(self):
-        """Data type of the data.  Inferred from ``read_data_row(0)``."""
-        return self.read_data_row(0).dtype
+        """Data type of the decoded data.
 
-    def read_data_row(self, index, weighted=False):
-        if index >= self.nrow:
-            raise EOFError("cannot read from beyond end of input SUBINT HDU.")
+        Inferred from the types of the 'DATA', 'DAT_SCL' and 'DAT_OFFS'
+        columns.
+        """
+        return np.result_type(self.data['DATA'].dtype,
+                              self.data['DAT_SCL'].dtype,
+                              self.data['DAT_OFFS'].dtype)
 
-        row = self.data[index]
-        # Reversed the header shape to match the data
-        data_scale = row['DAT_SCL'].reshape(-1, 1)
-        data_off_set = row['DAT_OFFS'].reshape(-1, 1)
+    @lazyproperty
+    def _zero_off(self):
+        """Zero offset of the raw data, from the 'ZERO_OFF' header keyword."""
         try:
-            zero_off = self.header['ZERO_OFF']
             # Sometimes zero_off equals * or some such
-            float(zero_off)
+            return float(self.header['ZERO_OFF'])
         except Exception:
-            zero_off = 0
-        result = (row['DATA'] - zero_off) * data_scale + data_off_set
+            return 0
+
+    def read_data_rows(self, start, stop, weighted=False, out=None):
+        """Decode a range of data rows.
+
+        Scales, offsets and possibly weights are applied in place on the
+        output, reading the raw data directly from the (possibly memory
+        mapped) 'DATA' column, without intermediate copies.
+
+        Parameters
+        ----------
+        start, stop : int
+            Range of rows to read.
+        weighted : bool, optional
+            Whether to apply the weights in the 'DAT_WTS' column.
+            Default: `False`.
+        out : `~numpy.ndarray`, optional
+            Array to store the output in.  Should have shape
+            ``(stop - start, nbin, nchan, npol)``.
+
+        Returns
+        -------
+        out : `~numpy.ndarray`
+            Decoded data, with shape ``(stop - start, nbin, nchan, npol)``,
+            i.e., the row order of axes reversed.
+        """
+        if not 0 <= start <= stop <= self.nrow:
+            raise EOFError("cannot read from beyond end of input SUBINT HDU.")
+
+        n = stop - start
+        if out is None:
+            out = np.empty((n, self.nbin, self.nchan, self.npol), self.dtype)
+        # The 'DATA' column has axes ordered (npol, nchan, nbin).
+        result = out.transpose(0, 3, 2, 1)
+        np.subtract(self.data['DATA'][start:stop], self._zero_off,
+                    out=result)
+        scale_shape = (n, self.npol, self.nchan, 1)
+        result *= self.data['DAT_SCL'][start:stop].reshape(scale_shape)
+        result += self.data['DAT_OFFS'][start:stop].reshape(scale_shape)
         if weighted and 'DAT_WTS' in self.data.names:
-            result *= row['DAT_WTS'].reshape(-1, 1)
-        return result
+            result *= self.data['DAT_WTS'][start:stop].reshape(
+                n, 1, self.nchan, 1)
+        return out
+
+    def read_data_row(self, index, weighted=False):
+        """Decode a single data row, with axes ordered (npol, nchan, nbin)."""
+        if index >= self.nrow:
+            raise EOFError("cannot read from beyond end of input SUBINT HDU.")
+
+        return self.read_data_rows(index, index + 1, weighted=weighted)[0].T
 
 
 class PSRSubintHDU(SubintHDU):
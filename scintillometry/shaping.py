@@ -1,7 +1,11 @@
 # Licensed under the GPLv3 - see LICENSE
+import importlib
+import io
+
 import numpy as np
 
-from .base import TaskBase, Task, check_broadcast_to, simplify_shape
+from .base import (TaskBase, Task, SetAttribute, check_broadcast_to,
+                   simplify_shape)
 
 
 __all__ = ['ChangeSampleShapeBase', 'ChangeSampleShape',
@@ -17,6 +21,12 @@ class ChangeSampleShapeBase(TaskBase):
     class ensures the operation is possible and that the ``frequency``,
     ``sideband``, and ``polarization`` attributes are adjusted similarly.
 
+    If the underlying stream is itself a sample shape operation, frames are
+    read directly from the stream underlying that, and both operations are
+    applied in turn.  Since operations like reshaping, transposing, and
+    slicing just create new views, a chain of those thus only needs a single
+    copy of the data, when the result is read.
+
     Parameters
     ----------
     ih : task or `baseband` stream reader
@@ -35,6 +45,29 @@ class ChangeSampleShapeBase(TaskBase):
             raise ValueError("change in shape affected the sample axis (0).")
 
         super().__init__(ih, shape=ih.shape[:1] + a.shape[1:])
+        # Set up the source of our frames and the operations to apply to
+        # them, bypassing the underlying stream if possible.
+        if (isinstance(ih, ChangeSampleShapeBase) and ih._composable and
+                ih.shape[0] == ih._source.shape[0] and
+                ih.samples_per_frame == self.samples_per_frame):
+            self._source = ih._source
+            self._tasks = ih._tasks + (self.task,)
+        else:
+            self._source = ih
+            self._tasks = (self.task,)
+
+    @property
+    def _composable(self):
+        """Whether our task can be applied without us reading the data."""
+        return True
+
+    def _read_frame(self, frame_index):
+        # Read data from the source and apply all operations.
+        self._source.seek(frame_index * self.samples_per_frame)
+        data = self._source.read(self.samples_per_frame)
+        for task in self._tasks:
+            data = task(data)
+        return data
 
     def _check_shape(self, value):
         """Broadcast value to the sample shape and apply shape changes.
@@ -107,6 +140,11 @@ class ChangeSampleShape(Task, ChangeSampleShapeBase):
     def __init__(self, ih, task, method=None):
         super().__init__(ih, task, method=method)
 
+    @property
+    def _composable(self):
+        # A method-like task may use our offset, so we need to read the data.
+        return getattr(self.task, '__self__', None) is not self
+
 
 class Reshape(ChangeSampleShapeBase):
     """Reshapes the sample shape of a stream.
@@ -290,6 +328,15 @@ class GetItem(ChangeSampleShapeBase):
 
     Useful to select, e.g., a specific frequency band or polariazation.
 
+    If the selection is done directly on a `baseband` stream reader, or on
+    one wrapped only in `~scintillometry.base.SetAttribute`, a new reader is
+    opened on the same file with the selection as its ``subset``, so that
+    only the parts of the data that are needed get decoded.  This is done
+    for VDIF, DADA and GUPPI readers of single files; for other formats,
+    for sequences of files, or if any other task sits in between, the
+    selection is done on the data read.  The new reader is closed when this
+    task is closed.
+
     Parameters
     ----------
     ih : task or `baseband` stream reader
@@ -334,7 +381,74 @@ class GetItem(ChangeSampleShapeBase):
         else:
             self._item = (slice(None), item)
         super().__init__(ih)
+        # Try letting the source do the selection.
+        self._subset_reader = None
+        if self._tasks == (self.task,):
+            source = self._source
+            while isinstance(source, SetAttribute):
+                source = source.ih
+            subset_reader = _open_subset_reader(source, self._item[1:])
+            if subset_reader is not None:
+                if subset_reader.sample_shape == self.sample_shape:
+                    self._subset_reader = self._source = subset_reader
+                    self._tasks = ()
+                else:
+                    subset_reader.close()
 
     def task(self, data):
         """Get the preset item from the data."""
         return data[self._item]
+
+    def close(self):
+        """Close task, including any reader opened for the selection."""
+        super().close()
+        if self._subset_reader is not None:
+            self._subset_reader.close()
+            self._subset_reader = None
+
+
+# Stream readers for which a reader with a subset can be opened, with the
+# keyword arguments to copy from the original reader.
+_SUBSET_READER_ARGS = {
+    'VDIFStreamReader': ('sample_rate', 'squeeze', 'fill_value', 'verify'),
+    'DADAStreamReader': ('squeeze', 'verify'),
+    'GUPPIStreamReader': ('squeeze', 'verify'),
+}
+
+
+def _open_subset_reader(fh, subset):
+    """Open a baseband reader on the file of fh that only decodes subset.
+
+    The file is opened anew, using the ``open`` function of the baseband
+    format, so the new reader has its own file handle.  Only readers of
+    formats listed in ``_SUBSET_READER_ARGS`` are supported, and only if
+    they read a single file and do not already use a subset.
+
+    Returns `None` if no suitable reader could be opened.
+    """
+    reader_args = _SUBSET_READER_ARGS.get(type(fh).__name__)
+    if (reader_args is None or
+            not type(fh).__module__.startswith('baseband.') or
+            fh.subset != ()):
+        return None
+    # We can only reopen regular files, not, e.g., in-memory buffers.
+    raw = getattr(fh.fh_raw, 'fh_raw', None)
+    if (not isinstance(raw, io.IOBase) or
+            not isinstance(getattr(raw, 'name', None), str)):
+        return None
+
+    fmt = importlib.import_module(type(fh).__module__.rpartition('.')[0])
+    kwargs = {name: getattr(fh, name) for name in reader_args}
+    try:
+        subset_reader = fmt.open(raw.name, 'rs', subset=subset, **kwargs)
+    except (OSError, IndexError):
+        # File no longer accessible or subset not valid for the reader.
+        return None
+
+    if (subset_reader.shape[0] != fh.shape[0] or
+            subset_reader.samples_per_frame != fh.samples_per_frame or
+            subset_reader.start_time != fh.start_time):
+        subset_reader.close()
+        return None
+
+    return subset_reader
@@ -8,8 +8,8 @@ import numpy as np
 import astropy.units as u
 import pytest
 
-from ..base import (BaseTaskBase, SetAttribute, TaskBase, PaddedTaskBase,
-                    Task)
+from ..base import (BaseTaskBase, SetAttribute, TimeSlice, TaskBase,
+                    PaddedTaskBase, Task)
 from .common import UseVDIFSample
 
 
@@ -110,6 +110,82 @@ class TestSetAttribute(UseVDIFSample):
         sa.close()
 
 
+class TestTimeSlice(UseVDIFSample):
+    def test_offsets(self):
+        fh = self.fh
+        expected = fh.read()
+        ts = TimeSlice(fh, 1234, 31234)
+        assert ts.shape == (30000,) + fh.sample_shape
+        # Largest divisor of the slice length up to that of the stream.
+        assert ts.samples_per_frame == 15000
+        assert ts.start_time == fh.start_time + 1234 / fh.sample_rate
+        assert abs(ts.stop_time - fh.start_time -
+                   31234 / fh.sample_rate) < 1. * u.ns
+        assert ts.sample_rate == fh.sample_rate
+        assert ts.dtype == fh.dtype
+        data = ts.read()
+        assert np.all(data == expected[1234:31234])
+        assert ts.tell() == 30000
+        with pytest.raises(EOFError):
+            ts.read(1)
+        ts.seek(-10, 2)
+        out = np.empty((10,) + fh.sample_shape, fh.dtype)
+        result = ts.read(out=out)
+        assert result is out
+        assert np.all(out == expected[31224:31234])
+        ts.close()
+
+    def test_times(self):
+        fh = self.fh
+        expected = fh.read()
+        start = fh.start_time + 1000 / fh.sample_rate
+        ts = TimeSlice(fh, start, 0.5 * u.ms)
+        assert ts.start_time == start
+        assert ts.shape[0] == 15000
+        assert ts.samples_per_frame == 15000
+        ts.seek(start + 10 / fh.sample_rate)
+        assert np.all(ts.read(10) == expected[1010:1020])
+        # Defaults give the whole stream.
+        ts2 = TimeSlice(fh)
+        assert ts2.shape == fh.shape
+        assert ts2.start_time == fh.start_time
+
+    def test_downstream(self):
+        fh = self.fh
+        expected = fh.read()
+        ts = TimeSlice(fh, 100, 5100)
+        task = Task(ts, lambda data: data * 2, samples_per_frame=1000)
+        assert task.shape == (5000,) + fh.sample_shape
+        assert task.start_time == ts.start_time
+        assert np.all(task.read() == expected[100:5100] * 2)
+
+    def test_downstream_not_frame_aligned(self):
+        # A task using the default samples per frame should see the
+        # whole slice, even if it does not span whole underlying frames.
+        fh = self.fh
+        expected = fh.read()
+        ts = TimeSlice(fh, 0, 25000)
+        assert ts.shape[0] % ts.samples_per_frame == 0
+        task = Task(ts, lambda data: data * 2)
+        assert task.shape == (25000,) + fh.sample_shape
+        assert np.all(task.read() == expected[:25000] * 2)
+        sa = SetAttribute(TimeSlice(fh, 3, 30000))
+        assert sa.shape == (29997,) + fh.sample_shape
+
+    def test_invalid(self):
+        fh = self.fh
+        with pytest.raises(ValueError):
+            TimeSlice(fh, 100, 100)
+        with pytest.raises(ValueError):
+            TimeSlice(fh, -1)
+        with pytest.raises(ValueError):
+            TimeSlice(fh, stop=fh.shape[0] + 1)
+        with pytest.raises(ValueError):
+            TimeSlice(fh, 0, 100, samples_per_frame=200)
+        with pytest.raises(ValueError):
+            TimeSlice(fh, 0, 100, samples_per_frame=30)
+
+
 class TestTaskBase(UseVDIFSample):
     def test_basetaskbase(self):
         fh = self.fh
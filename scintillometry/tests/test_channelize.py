@@ -2,11 +2,17 @@
 
 import numpy as np
 import astropy.units as u
+from astropy.time import Time
 import pytest
 
 from ..base import SetAttribute
-from ..channelize import Channelize, Dechannelize
+from ..channelize import (Channelize, Dechannelize, PolyphaseChannelize,
+                          PolyphaseDechannelize, prototype_filter,
+                          Spectrometer, ZoomChannelize)
 from ..fourier import get_fft_maker
+from ..functions import Square, Power
+from ..generators import NoiseGenerator, StreamGenerator
+from ..integration import Integrate
 
 from .common import UseVDIFSample, UseDADASample
 
@@ -159,3 +165,233 @@ class TestChannelizeComplex(UseDADASample):
         ft2 = ct2.read()
         assert np.all(ft == ft2)
         dt2.close()
+
+
+class TestZoomChannelize(UseDADASample):
+    def setup(self):
+        super().setup()
+        self.fh_freq = SetAttribute(
+            self.fh, frequency=self.fh.header0['FREQ']*u.MHz,
+            sideband=np.where(self.fh.header0.sideband, 1, -1))
+
+    @pytest.mark.parametrize('n, start, stop', [
+        (1024, 10, 14),
+        (1024, 100, 200),
+        (1024, -3, 5),
+        (1000, 497, 503),
+        (97, 10, 20),
+        (64, 0, 64)])
+    def test_against_channelize(self, n, start, stop):
+        ref = Channelize(self.fh_freq, n)
+        zh = ZoomChannelize(self.fh_freq, n, start, stop, samples_per_frame=2)
+        channels = np.arange(start, stop) % n
+        assert zh.shape[1:] == (len(channels),) + ref.shape[2:]
+        assert zh.sample_rate == ref.sample_rate
+        assert zh.dtype == ref.dtype
+        assert zh.start_time == ref.start_time
+        assert np.all(zh.frequency == ref.frequency[channels])
+        assert np.all(zh.sideband == ref.sideband)
+        data = zh.read()
+        expected = ref.read(data.shape[0])[:, channels]
+        assert np.allclose(data, expected, rtol=0,
+                           atol=1e-5 * np.abs(expected).max())
+
+    def test_wrong_channels(self):
+        with pytest.raises(ValueError):
+            ZoomChannelize(self.fh, 64, 10, 10)
+        with pytest.raises(ValueError):
+            ZoomChannelize(self.fh, 64, 0, 65)
+
+
+class TestZoomChannelizeReal(UseVDIFSample):
+    @pytest.mark.parametrize('start, stop', [(0, 3), (30, 33), (10, 11)])
+    def test_against_channelize(self, start, stop):
+        ref = Channelize(self.fh, 64)
+        zh = ZoomChannelize(self.fh, 64, start, stop)
+        assert zh.shape == (ref.shape[0], stop-start) + ref.shape[2:]
+        assert zh.dtype == ref.dtype
+        data = zh.read()
+        expected = ref.read()[:, start:stop]
+        assert np.allclose(data, expected, rtol=0,
+                           atol=1e-5 * np.abs(expected).max())
+
+    def test_wrong_channels(self):
+        with pytest.raises(ValueError):
+            ZoomChannelize(self.fh, 64, 30, 34)
+        with pytest.raises(ValueError):
+            ZoomChannelize(self.fh, 64, -1, 2)
+
+
+class TestSpectrometer(UseDADASample):
+    def setup(self):
+        super().setup()
+        self.fh_pol = SetAttribute(
+            self.fh, frequency=self.fh.header0['FREQ']*u.MHz,
+            sideband=np.where(self.fh.header0.sideband, 1, -1),
+            polarization=np.array(['L', 'R']))
+
+    @pytest.mark.parametrize('samples_per_frame', (1, 3))
+    @pytest.mark.parametrize('cross', (False, True))
+    def test_against_chain(self, cross, samples_per_frame):
+        detect = Power if cross else Square
+        ref = Integrate(detect(Channelize(self.fh_pol, 64)), 10)
+        sp = Spectrometer(self.fh_pol, 64, 10, cross=cross,
+                          samples_per_frame=samples_per_frame)
+        n_sample = (ref.shape[0] // samples_per_frame) * samples_per_frame
+        assert sp.shape == (n_sample,) + ref.shape[1:]
+        assert sp.dtype == ref.dtype
+        assert sp.sample_rate == ref.sample_rate
+        assert sp.start_time == ref.start_time
+        assert np.all(sp.frequency == ref.frequency)
+        assert np.all(sp.sideband == ref.sideband)
+        assert np.all(sp.polarization == ref.polarization)
+        expected = ref.read(n_sample)
+        data = sp.read()
+        # Cross terms can nearly cancel, so compare with absolute tolerance.
+        assert np.allclose(data, expected, rtol=0,
+                           atol=1.e-5 * np.abs(expected).max())
+        sp.seek(-2, 2)
+        data2 = sp.read()
+        assert np.all(data2 == data[-2:])
+
+    def test_no_average(self):
+        ref = Integrate(Square(Channelize(self.fh, 64)), 10, average=False)
+        sp = Spectrometer(self.fh, 64, 10, average=False)
+        assert np.allclose(sp.read(), ref.read()['data'], rtol=1.e-5)
+
+    def test_missing_polarization(self):
+        with pytest.raises(AttributeError):
+            Spectrometer(self.fh, 64, cross=True)
+        sp = Spectrometer(self.fh, 64)
+        with pytest.raises(AttributeError):
+            sp.polarization
+
+
+class TestSpectrometerReal(UseVDIFSample):
+    def test_against_chain(self):
+        fh = SetAttribute(self.fh, polarization=np.tile(['L', 'R'], 4))
+        ref = Integrate(Square(Channelize(fh, 64)), 5)
+        sp = Spectrometer(fh, 64, 5)
+        assert sp.shape == ref.shape
+        assert np.all(sp.polarization == np.tile(['LL', 'RR'], 4))
+        assert np.allclose(sp.read(), ref.read(), rtol=1.e-5)
+
+
+class TestPolyphaseChannelize:
+    def setup(self):
+        self.n = 32
+        self.nh = NoiseGenerator((4096, 2), Time('2010-11-12T13:14:15'),
+                                 1. * u.MHz, samples_per_frame=256,
+                                 frequency=300. * u.MHz, sideband=1,
+                                 seed=12345)
+        self.raw_data = self.nh.read()
+
+    def pfb(self, n_tap, step, window=np.hanning):
+        """Reference polyphase filterbank, calculated the slow way."""
+        n_raw = self.n * n_tap
+        prototype = prototype_filter(self.n, n_tap, window).ravel()
+        n_spectra = (self.raw_data.shape[0] - n_raw) // step + 1
+        offsets = np.arange(n_spectra)[:, np.newaxis] * step
+        raw = offsets + np.arange(n_raw)
+        phase = np.exp(-2j * np.pi * raw[..., np.newaxis] *
+                       np.arange(self.n) / self.n)
+        return np.einsum('l,slk,slp->skp', prototype, phase,
+                         self.raw_data[raw])
+
+    def test_flat_prototype_is_channelize(self):
+        pt = PolyphaseChannelize(self.nh, self.n, n_tap=1,
+                                 window=np.ones(self.n))
+        ct = Channelize(self.nh, self.n)
+        assert pt.shape == ct.shape
+        assert pt.start_time == ct.start_time
+        assert pt.sample_rate == ct.sample_rate
+        assert np.all(pt.frequency == ct.frequency)
+        assert np.all(pt.read() == ct.read())
+
+    @pytest.mark.parametrize('samples_per_frame', (1, 5))
+    @pytest.mark.parametrize('step', (32, 16, 24))
+    def test_against_reference(self, step, samples_per_frame):
+        expected = self.pfb(4, step)
+        pt = PolyphaseChannelize(self.nh, self.n, n_tap=4, step=step,
+                                 samples_per_frame=samples_per_frame)
+        n_spectra = (expected.shape[0] // samples_per_frame) * samples_per_frame
+        assert pt.shape == (n_spectra, self.n, 2)
+        assert pt.sample_rate == self.nh.sample_rate / step
+        assert abs(pt.start_time - self.nh.start_time -
+                   1.5 * self.n / self.nh.sample_rate) < 1. * u.ns
+        data = pt.read()
+        assert np.allclose(data, expected[:n_spectra], atol=1.e-5)
+        # Seeking and selective channelization.
+        pt.seek(-3, 2)
+        data2 = pt.read()
+        assert np.all(data2 == data[-3:])
+
+    @pytest.mark.parametrize('step', (32, 16))
+    def test_real(self, step):
+        nh = NoiseGenerator((4096, 2), Time('2010-11-12T13:14:15'),
+                            1. * u.MHz, samples_per_frame=256,
+                            seed=12345, dtype='f4')
+        pt = PolyphaseChannelize(nh, self.n, step=step)
+        assert pt.shape[1:] == (self.n // 2 + 1, 2)
+        assert pt.dtype == np.dtype('c8')
+        # Real and complex give the same for the positive frequencies.
+        self.raw_data = nh.read().astype('c8')
+        expected = self.pfb(4, step)
+        assert np.allclose(pt.read(), expected[:, :self.n // 2 + 1],
+                           atol=1.e-4)
+
+    @pytest.mark.parametrize('step', (32, 16))
+    def test_stft_round_trip(self, step):
+        # With n_tap=1, this is a windowed short-time Fourier transform,
+        # which can be inverted exactly (if the window has no zeros).
+        pt = PolyphaseChannelize(self.nh, self.n, n_tap=1, step=step,
+                                 window=np.hamming)
+        dt = pt.inverse(pt)
+        assert dt.sample_rate == self.nh.sample_rate
+        assert np.all(dt.frequency == self.nh.frequency)
+        data = dt.read()
+        offset = ((dt.start_time - self.nh.start_time) *
+                  self.nh.sample_rate).to_value(u.one)
+        assert abs(offset - (self.n - step)) < 1.e-3
+        assert np.allclose(data, self.raw_data[self.n - step:][:len(data)],
+                           atol=1.e-5)
+
+    def test_oversampled_round_trip(self):
+        pt = PolyphaseChannelize(self.nh, self.n, step=self.n // 4)
+        dt = PolyphaseDechannelize(pt, step=self.n // 4)
+        data = dt.read()
+        offset = ((dt.start_time - self.nh.start_time) *
+                  self.nh.sample_rate).to_value(u.one)
+        assert abs(offset - 120) < 1.e-3
+        expected = self.raw_data[120:][:len(data)]
+        assert np.allclose(data, expected, atol=0.05)
+        # Channel centres are reproduced exactly.
+        tone = np.exp(2j * np.pi * 5 / self.n * np.arange(4096))
+        th = StreamGenerator(
+            lambda sh: tone[sh.tell():sh.tell()+256, np.newaxis],
+            shape=(4096, 1), start_time=self.nh.start_time,
+            sample_rate=self.nh.sample_rate, samples_per_frame=256,
+            frequency=self.nh.frequency, sideband=self.nh.sideband,
+            dtype='c16')
+        pt = PolyphaseChannelize(th, self.n)
+        dt = pt.inverse(pt)
+        data = dt.read()
+        offset = int(((dt.start_time - th.start_time) *
+                      th.sample_rate).to_value(u.one).round())
+        assert np.allclose(data, tone[offset:offset+len(data), np.newaxis],
+                           atol=1.e-5)
+
+    def test_wrong_arguments(self):
+        with pytest.raises(ValueError):
+            PolyphaseChannelize(self.nh, self.n, step=self.n + 1)
+        with pytest.raises(ValueError):
+            PolyphaseChannelize(self.nh, self.n, window=np.ones(self.n))
+        pt = PolyphaseChannelize(self.nh, self.n)
+        with pytest.raises(ValueError):
+            PolyphaseDechannelize(pt, dtype='f4')
+        with pytest.raises(ValueError):
+            PolyphaseDechannelize(pt, samples_per_frame=33)
+        # A window with zeros cannot be inverted for critical sampling.
+        pt = PolyphaseChannelize(self.nh, self.n, n_tap=1)
+        with pytest.raises(ValueError):
+            pt.inverse(pt)
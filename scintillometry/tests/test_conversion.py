@@ -8,8 +8,9 @@ from numpy.testing import assert_allclose
 import astropy.units as u
 from astropy.time import Time
 
-from ..conversion import Real2Complex
+from ..conversion import Real2Complex, DownConvert
 from ..generators import StreamGenerator, EmptyStreamGenerator
+from ..fourier import get_fft_maker
 
 
 def test_real_to_complex_delta():
@@ -86,3 +87,170 @@ def test_real_to_complex_sine(f_nyquist):
     assert_allclose(complex_signal, complex_dc, atol=1e-8)
     assert real2complex.frequency == 399.5 * u.kHz
     assert real2complex.sideband == -1
+
+
+def make_sine(f_nyquist, samples_per_frame=1024, shape=(16384,)):
+    def real_sine(handle):
+        n = handle.offset + np.arange(handle.samples_per_frame)
+        return np.sin(f_nyquist * np.pi * n).reshape(
+            (-1,) + (1,) * (len(shape) - 1)) * np.ones(shape[1:])
+
+    return StreamGenerator(real_sine,
+                           samples_per_frame=samples_per_frame,
+                           start_time=Time('2010-11-12T13:14:15'),
+                           sample_rate=1. * u.kHz,
+                           shape=shape, dtype='f8')
+
+
+def expected_sine(f_nyquist, n, overlap=0):
+    m = np.arange(n)
+    return (-1j * np.exp(1j * np.pi * f_nyquist * (2 * m + overlap)) *
+            (-1) ** m)
+
+
+@pytest.mark.parametrize('samples_per_frame', (256, 255))
+def test_real_to_complex_against_direct(samples_per_frame):
+    """Compare with the Hilbert transform done with complex FFTs."""
+    fh = make_sine(0.3 + 1 / 3000, shape=(16384, 2))
+    np.random.seed(1234)
+    noise = np.random.normal(size=(fh.shape[0], 2))
+    data = fh.read() + noise
+    ih = StreamGenerator(lambda h: data[h.offset:
+                                        h.offset+h.samples_per_frame],
+                         samples_per_frame=1024, start_time=fh.start_time,
+                         sample_rate=fh.sample_rate, shape=data.shape,
+                         dtype='f8')
+    r2c = Real2Complex(ih, samples_per_frame=samples_per_frame)
+    assert r2c.shape == (16384 // 2 // samples_per_frame *
+                         samples_per_frame, 2)
+    result = r2c.read()
+    n = 2 * samples_per_frame
+    h = np.zeros((n, 1))
+    h[0] = h[n // 2] = 1
+    h[1:n // 2] = 2
+    for i in range(r2c.shape[0] // samples_per_frame):
+        z = np.fft.ifft(np.fft.fft(data[i*n:(i+1)*n], axis=0) * h, axis=0)
+        # Frequency shift relative to the start of the stream.
+        z *= np.exp(-1j * np.pi / 2 * (i * n + np.arange(n)))[:, np.newaxis]
+        assert_allclose(result[i*samples_per_frame:(i+1)*samples_per_frame],
+                        z[::2], atol=1e-10)
+
+
+def test_real_to_complex_task():
+    """Check that task converts a single frame like the old implementation."""
+    fh = make_sine(0.3 + 1 / 3000, shape=(2048, 2))
+    r2c = Real2Complex(fh, samples_per_frame=512)
+    np.random.seed(1234)
+    data = np.random.normal(size=(1024, 2))
+    result = r2c.task(data)
+    assert result.shape == (512, 2)
+    assert result.dtype == r2c.dtype
+    n = 1024
+    h = np.zeros((n, 1))
+    h[0] = h[n // 2] = 1
+    h[1:n // 2] = 2
+    z = np.fft.ifft(np.fft.fft(data, axis=0) * h, axis=0)
+    z *= np.exp(-1j * np.pi / 2 * np.arange(n))[:, np.newaxis]
+    assert_allclose(result, z[::2], atol=1e-10)
+
+
+def test_real_to_complex_overlap():
+    """Check that overlapping frames reduce edge artifacts."""
+    f_nyquist = 0.3 + 1 / 3000
+    fh = make_sine(f_nyquist)
+    r2c = Real2Complex(fh, samples_per_frame=512)
+    expected = expected_sine(f_nyquist, r2c.shape[0])
+    error = np.abs(r2c.read() - expected)
+    assert error.max() > 0.1
+    r2c = Real2Complex(fh, samples_per_frame=512, overlap=256)
+    assert r2c.shape == (7680, )
+    assert abs(r2c.start_time - fh.start_time - 256 * u.ms) < 1 * u.ns
+    result = r2c.read()
+    expected = expected_sine(f_nyquist, r2c.shape[0], overlap=256)
+    overlap_error = np.abs(result - expected)
+    assert overlap_error.max() < 0.01
+    # Check reading from arbitrary places.
+    r2c.seek(1000)
+    assert_allclose(r2c.read(10), result[1000:1010])
+
+
+def test_real_to_complex_positional_fft():
+    fh = make_sine(0.3)
+    FFT = get_fft_maker('numpy')
+    r2c = Real2Complex(fh, 512, FFT)
+    assert r2c._FFT is FFT
+    assert_allclose(r2c.read(), Real2Complex(fh, 512).read(), atol=1e-10)
+
+
+def test_real_to_complex_wrong_overlap():
+    fh = make_sine(0.3)
+    with pytest.raises(ValueError):
+        Real2Complex(fh, overlap=-2)
+    with pytest.raises(ValueError):
+        Real2Complex(fh, overlap=3)
+
+
+class TestDownConvert:
+    def setup(self):
+        self.sample_rate = 1. * u.MHz
+        self.start_time = Time('2010-11-12T13:14:15')
+
+    def make_tone(self, f, shape=(32768,), real=False):
+        def tone(handle):
+            n = handle.offset + np.arange(handle.samples_per_frame)
+            phase = 2 * np.pi * (f / self.sample_rate).to_value(u.one) * n
+            data = np.sin(phase) if real else np.exp(1j * phase)
+            return data.reshape((-1,) + (1,) * (len(shape) - 1)
+                                ) * np.ones(shape[1:])
+
+        return StreamGenerator(tone, samples_per_frame=1024,
+                               start_time=self.start_time,
+                               sample_rate=self.sample_rate,
+                               frequency=300. * u.MHz, sideband=1,
+                               shape=shape, dtype='f8' if real else 'c16')
+
+    def expected(self, f, dc):
+        n = (np.arange(dc.shape[0]) * dc._decimation + dc._pad_start)
+        phase = 2 * np.pi * ((f - dc.mix_frequency) /
+                             self.sample_rate).to_value(u.one) * n
+        return np.exp(1j * phase)
+
+    @pytest.mark.parametrize('samples_per_frame', (None, 100))
+    def test_tone(self, samples_per_frame):
+        fh = self.make_tone(201. * u.kHz, shape=(32768, 2))
+        dc = DownConvert(fh, 200. * u.kHz, 16,
+                         samples_per_frame=samples_per_frame)
+        assert dc.sample_rate == self.sample_rate / 16
+        assert dc.dtype == np.dtype('c16')
+        assert dc.shape[1:] == (2,)
+        assert dc.shape[0] % dc.samples_per_frame == 0
+        assert dc.shape[0] * 16 <= fh.shape[0] - 255
+        assert abs(dc.start_time - self.start_time - 128 * u.us) < 1 * u.ns
+        assert np.all(dc.frequency == 300.2 * u.MHz)
+        data = dc.read()
+        expected = self.expected(201. * u.kHz, dc)
+        assert_allclose(data, expected[:, np.newaxis] * [1, 1], atol=0.01)
+        # Reading parts should give the same result.
+        dc.seek(123)
+        assert_allclose(dc.read(10), data[123:133])
+
+    def test_out_of_band(self):
+        fh = self.make_tone(250. * u.kHz)
+        dc = DownConvert(fh, 200. * u.kHz, 16)
+        assert np.abs(dc.read()).max() < 0.01
+
+    def test_real(self):
+        fh = self.make_tone(99. * u.kHz, real=True)
+        dc = DownConvert(fh, 100. * u.kHz, 8, n_tap=32)
+        assert dc.dtype == np.dtype('c16')
+        data = dc.read()
+        # sin = (exp(i phi) - exp(-i phi)) / 2i; only the second is in band.
+        expected = -0.5j * self.expected(99. * u.kHz, dc)
+        assert_allclose(data, expected, atol=0.01)
+
+    def test_wrong_arguments(self):
+        fh = self.make_tone(0. * u.kHz)
+        with pytest.raises(ValueError):
+            DownConvert(fh, 0. * u.kHz, 0)
+        with pytest.raises(ValueError):
+            DownConvert(fh, 0. * u.kHz, 8, n_tap=0)
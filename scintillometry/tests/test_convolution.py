@@ -6,8 +6,11 @@ from numpy.testing import assert_array_equal
 import astropy.units as u
 from astropy.time import Time
 
-from ..convolution import Convolve, ConvolveSamples
-from ..generators import NoiseGenerator
+from .. import convolution
+from ..convolution import Convolve, ConvolveSamples, ConvolveBank
+from ..fourier import get_fft_maker
+from ..generators import (EmptyStreamGenerator, NoiseGenerator,
+                          StreamGenerator)
 
 from .common import UseDADASample
 
@@ -80,7 +83,175 @@ class TestConvolveNoise:
         data1 = ct.read()
         assert np.allclose(data1, expected[:data1.shape[0]])
 
+    @pytest.mark.parametrize('convolve_task', (ConvolveSamples, Convolve))
+    def test_against_np_convolve(self, convolve_task):
+        nh = NoiseGenerator(shape=(4000, 4, 2), start_time=self.start_time,
+                            sample_rate=self.sample_rate,
+                            samples_per_frame=200, dtype='c8', seed=12345)
+        data = nh.read()
+        np.random.seed(1234)
+        response = np.random.normal(size=(5, 4, 1))
+        ct = convolve_task(nh, response, samples_per_frame=256)
+        result = ct.read()
+        assert result.shape == (3780, 4, 2)
+        for index in np.ndindex(data.shape[1:]):
+            expected = np.convolve(data[(slice(None),) + index],
+                                   response[:, index[0], 0], mode='valid')
+            assert np.allclose(result[(slice(None),) + index],
+                               expected[:len(result)], atol=1e-5)
+
+    @pytest.mark.parametrize('dtype', ('f4', 'f8', 'c8', 'c16'))
+    def test_samples_exact(self, dtype):
+        # Direct convolution should give the same results as np.convolve,
+        # except for rounding differences for double-precision complex data.
+        np.random.seed(1234)
+        data = np.random.normal(size=(1000, 4, 2))
+        if dtype[0] == 'c':
+            data = data + 1j * np.random.normal(size=data.shape)
+        data = data.astype(dtype)
+        response = np.random.normal(size=(5, 4, 1))
+        fh = StreamGenerator(lambda fh: data[fh.tell():fh.tell() +
+                                             fh.samples_per_frame],
+                             shape=data.shape, start_time=self.start_time,
+                             sample_rate=self.sample_rate,
+                             samples_per_frame=100, dtype=dtype)
+        ct = ConvolveSamples(fh, response, samples_per_frame=100)
+        result = ct.read()
+        assert result.dtype == data.dtype
+        expected = np.empty_like(result)
+        for index in np.ndindex(data.shape[1:]):
+            index = (slice(None),) + index
+            expected[index] = np.convolve(
+                data[index], response[index[:2] + (0,)],
+                mode='valid')[:len(result)]
+        if dtype == 'c16':
+            assert np.allclose(result, expected, rtol=1e-14, atol=1e-14)
+        else:
+            assert np.all(result == expected)
+
+    @pytest.mark.parametrize('method', ('direct', 'fft', 'overlap-add'))
+    @pytest.mark.parametrize('block_size', (None, 16, 50))
+    def test_methods(self, method, block_size):
+        np.random.seed(1234)
+        response = np.random.normal(size=(7, 2))
+        ct = Convolve(self.nh, response, samples_per_frame=400, method=method,
+                      block_size=block_size)
+        assert ct.method == method
+        data = ct.read()
+        expected = ConvolveSamples(self.nh, response,
+                                   samples_per_frame=400).read()
+        assert np.allclose(data, expected)
+
+    def test_auto(self):
+        FFT = get_fft_maker('numpy')
+        ct = Convolve(self.nh, self.response, samples_per_frame=4096,
+                      method='auto', FFT=FFT)
+        assert ct.method == 'direct'
+        response = np.ones(1000)
+        ct = Convolve(self.nh, response, samples_per_frame=4096,
+                      method='auto', FFT=FFT)
+        assert ct.method == 'fft'
+        eh = EmptyStreamGenerator(shape=(2 ** 17, 2),
+                                  start_time=self.start_time,
+                                  sample_rate=self.sample_rate,
+                                  samples_per_frame=1024, dtype='c8')
+        ct = Convolve(eh, np.ones(16), samples_per_frame=2 ** 16,
+                      method='auto', block_size=128, FFT=FFT)
+        assert ct.method == 'overlap-add'
+
+    def test_calibrate(self):
+        ct = Convolve(self.nh, np.ones(100), samples_per_frame=4096,
+                      method='auto', calibrate=True)
+        assert ct.method in ('direct', 'fft', 'overlap-add')
+        ct2 = Convolve(self.nh, np.ones(100), samples_per_frame=4096)
+        assert np.allclose(ct.read(), ct2.read())
+
+    def test_auto_other_fft_engine(self, monkeypatch):
+        # Cost estimates are for numpy; other engines should be timed.
+        monkeypatch.setattr(convolution, 'NumpyFFTMaker', type(None))
+
+        def no_estimate(self):
+            raise AssertionError('should not estimate cost')
+
+        monkeypatch.setattr(Convolve, '_estimate_cost', no_estimate)
+        ct = Convolve(self.nh, np.ones(100), samples_per_frame=4096,
+                      method='auto')
+        assert ct.method in ('direct', 'fft', 'overlap-add')
+
+    def test_overlap_add_minimum_block_size(self):
+        np.random.seed(1234)
+        response = np.random.normal(size=(10, 2))
+        ct = Convolve(self.nh, response, samples_per_frame=64,
+                      method='overlap-add', block_size=19)
+        expected = ConvolveSamples(self.nh, response,
+                                   samples_per_frame=64).read()
+        assert np.allclose(ct.read(), expected)
+        with pytest.raises(ValueError):
+            Convolve(self.nh, response, samples_per_frame=64,
+                     method='overlap-add', block_size=18)
+
+    def test_wrong_method(self):
+        with pytest.raises(ValueError):
+            Convolve(self.nh, self.response, method='slow')
+        with pytest.raises(ValueError):
+            Convolve(self.nh, self.response, method='overlap-add',
+                     block_size=2)
+
     @pytest.mark.parametrize('convolve_task', (ConvolveSamples, Convolve))
     def test_wrong_response(self, convolve_task):
         with pytest.raises(ValueError):
             convolve_task(self.nh, np.ones((3, 3)))
+
+
+class TestConvolveBank:
+    def setup(self):
+        self.start_time = Time('2010-11-12T13:14:15')
+        self.sample_rate = 10. * u.kHz
+        self.nh = NoiseGenerator(shape=(16000, 2),
+                                 start_time=self.start_time,
+                                 sample_rate=self.sample_rate,
+                                 samples_per_frame=200, dtype=np.float,
+                                 seed=12345)
+        np.random.seed(1234)
+        self.responses = np.random.normal(size=(4, 9))
+
+    @pytest.mark.parametrize('offset', (0, 4))
+    def test_against_convolve(self, offset):
+        cb = ConvolveBank(self.nh, self.responses, offset=offset,
+                          samples_per_frame=512)
+        assert cb.shape == (15624, 4, 2)
+        assert abs(cb.start_time - self.start_time -
+                   (8 - offset) / self.sample_rate) < 1. * u.ns
+        data = cb.read()
+        assert data.dtype == self.nh.dtype
+        for i, response in enumerate(self.responses):
+            ct = Convolve(self.nh, response, offset=offset,
+                          samples_per_frame=512)
+            assert np.allclose(data[:, i], ct.read())
+
+    def test_sample_dependent_responses(self):
+        responses = self.responses.reshape(2, 9, 2)
+        cb = ConvolveBank(self.nh, responses, samples_per_frame=512)
+        assert cb.sample_shape == (2, 2)
+        cb.seek(1000)
+        data = cb.read(100)
+        for i in range(2):
+            ct = Convolve(self.nh, responses[i], samples_per_frame=512)
+            ct.seek(1000)
+            assert np.allclose(data[:, i], ct.read(100))
+
+    def test_complex(self):
+        nh = NoiseGenerator(shape=(4000, 2), start_time=self.start_time,
+                            sample_rate=self.sample_rate,
+                            samples_per_frame=200, dtype='c8', seed=12345)
+        responses = self.responses * np.exp(1j * self.responses)
+        cb = ConvolveBank(nh, responses, samples_per_frame=256)
+        data = cb.read()
+        assert data.dtype == nh.dtype
+        for i, response in enumerate(responses):
+            ct = Convolve(nh, response, samples_per_frame=256)
+            assert np.allclose(data[:, i], ct.read(), atol=1e-5)
+
+    def test_wrong_responses(self):
+        with pytest.raises(ValueError):
+            ConvolveBank(self.nh, np.ones((2, 3, 3)))
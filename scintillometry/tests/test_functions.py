@@ -7,7 +7,7 @@ import astropy.units as u
 from astropy.time import Time
 
 from ..base import SetAttribute
-from ..functions import Square, Power
+from ..functions import Square, Power, Stokes
 from ..generators import EmptyStreamGenerator
 from ..shaping import Reshape
 
@@ -92,6 +92,14 @@ class TestPoweDADAr(UseDADASample):
         assert np.allclose(ref_data, data1)
         pt.close()
 
+    def test_power_in_blocks(self):
+        pt = Power(self.fh, polarization=['L', 'R'])
+        expected = pt.read()
+        pt._block_size = 999
+        pt.seek(0)
+        data = pt.read()
+        assert np.all(data == expected)
+
     def test_polarization_propagation(self):
         # Add polarization information by hand.
         fh = SetAttribute(self.fh,
@@ -169,6 +177,67 @@ class TestPoweDADAr(UseDADASample):
             Power(eh, polarization=polarization)
 
 
+class TestStokesDADA(UseDADASample):
+    """Test getting Stokes parameters using Baseband's sample DADA file."""
+
+    def test_stokes_linear(self):
+        fh = self.fh
+        x, y = fh.read().T
+        expected = np.stack((np.abs(x) ** 2 + np.abs(y) ** 2,
+                             np.abs(x) ** 2 - np.abs(y) ** 2,
+                             2 * (x * y.conj()).real,
+                             -2 * (x * y.conj()).imag), axis=1)
+        st = Stokes(fh, polarization=['X', 'Y'])
+        assert np.all(st.polarization == np.array(['I', 'Q', 'U', 'V']))
+        data = st.read()
+        assert data.dtype == expected.dtype
+        assert np.allclose(data, expected, atol=1e-5 * expected.max())
+        # Order should not matter.
+        st2 = Stokes(fh, polarization=['Y', 'X'])
+        data2 = st2.read()
+        assert np.allclose(data2, expected * [1, -1, 1, -1],
+                           atol=1e-5 * expected.max())
+
+    @pytest.mark.parametrize('polarization', (['R', 'L'], ['L', 'R']))
+    def test_stokes_circular(self, polarization):
+        fh = self.fh
+        right, left = fh.read().T[::1 if polarization[0] == 'R' else -1]
+        expected = np.stack((np.abs(right) ** 2 + np.abs(left) ** 2,
+                             2 * (right * left.conj()).real,
+                             -2 * (right * left.conj()).imag,
+                             np.abs(right) ** 2 - np.abs(left) ** 2), axis=1)
+        st = Stokes(fh, polarization=polarization)
+        data = st.read()
+        assert np.allclose(data, expected, atol=1e-5 * expected.max())
+
+    def test_against_power(self):
+        fh = self.fh
+        pt = Power(fh, polarization=['L', 'R'])
+        ll, rr, lr, rl = pt.read().T
+        st = Stokes(fh, polarization=['L', 'R'])
+        i, q, u, v = st.read().T
+        assert np.allclose(i, ll + rr)
+        assert np.allclose(q, 2 * lr, atol=1e-5 * i.max())
+        assert np.allclose(u, 2 * rl, atol=1e-5 * i.max())
+        assert np.allclose(v, rr - ll, atol=1e-5 * i.max())
+
+    def test_other_axis(self):
+        eh = EmptyStreamGenerator((100, 2, 4), sample_rate=1.*u.Hz,
+                                  start_time=Time('2018-01-01'))
+        st = Stokes(eh, polarization=[['R'], ['L']])
+        assert st.shape == (100, 4, 4)
+        assert np.all(st.polarization == np.array([['I'], ['Q'], ['U'],
+                                                   ['V']]))
+
+    def test_wrong_polarization(self):
+        with pytest.raises(AttributeError):
+            Stokes(self.fh)
+        with pytest.raises(ValueError):
+            Stokes(self.fh, polarization=['X', 'R'])
+        with pytest.raises(ValueError):
+            Stokes(self.fh, polarization=['L'])
+
+
 class TestPowerVDIFFailures(UseVDIFSample):
     def test_wrong_polarization_vdif(self):
         with pytest.raises(AttributeError):
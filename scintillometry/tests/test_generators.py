@@ -4,9 +4,12 @@ import numpy as np
 import astropy.units as u
 from astropy.time import Time
 
-from ..generators import StreamGenerator, EmptyStreamGenerator, NoiseGenerator
+from ..generators import (StreamGenerator, EmptyStreamGenerator,
+                          NoiseGenerator, PulsarSignalGenerator)
 from ..functions import Square
 from ..base import Task
+from ..dispersion import Dedisperse
+from ..integration import Fold
 
 
 class StreamBase:
@@ -252,6 +255,27 @@ class TestNoise:
             assert not np.any(d2 == d4)
             assert np.all(d3 == d3_2)
 
+    @pytest.mark.parametrize('dtype', ('c8', 'c16', 'f4', 'f8'))
+    def test_random_access(self, dtype):
+        """Frames are independent of the order in which they are read."""
+        kwargs = dict(seed=self.seed, shape=self.shape,
+                      start_time=self.start_time,
+                      sample_rate=self.sample_rate,
+                      samples_per_frame=100, dtype=dtype)
+        with NoiseGenerator(**kwargs) as nh:
+            assert nh.dtype == np.dtype(dtype)
+            data = nh.read()
+            assert data.dtype == np.dtype(dtype)
+        with NoiseGenerator(**kwargs) as nh2:
+            nh2.seek(5050)
+            assert np.all(nh2.read(100) == data[5050:5150])
+            nh2.seek(0)
+            assert np.all(nh2.read(100) == data[:100])
+        # Different seeds should give different data.
+        kwargs['seed'] = self.seed + 1
+        with NoiseGenerator(**kwargs) as nh3:
+            assert not np.any(nh3.read(100) == data[:100])
+
     def test_use_as_source(self):
         """Test that noise routine with squarer gives expected levels."""
         nh = NoiseGenerator(seed=self.seed,
@@ -273,3 +297,99 @@ class TestNoise:
         nh.seek(-3, 2)
         noise2 = nh.read()
         assert np.all(data2 == noise2.real**2 + noise2.imag**2)
+
+
+class TestPulsarSignal:
+    def setup(self):
+        self.start_time = Time('2010-11-12T13:14:15')
+        self.sample_rate = 1. * u.MHz
+        self.period = 10. * u.ms
+        self.profile = np.zeros(100)
+        self.profile[20:22] = 50.
+        self.frequency = 320. * u.MHz + np.arange(4.) * u.MHz
+
+    def phase(self, t):
+        return ((t - self.start_time) / self.period).to(u.one) * u.cycle
+
+    def fold(self, ih):
+        fold = Fold(Square(ih), 100, self.phase,
+                    step=ih.stop_time - ih.start_time)
+        return fold.read()[0]
+
+    @pytest.mark.parametrize('dtype', ('c8', 'f8'))
+    def test_basics(self, dtype):
+        with PulsarSignalGenerator(self.phase, self.profile, (50000, 2),
+                                   self.start_time, self.sample_rate,
+                                   samples_per_frame=5000, dtype=dtype,
+                                   noise_level=0., seed=1) as ph:
+            assert ph.shape == (50000, 2)
+            assert ph.dtype == np.dtype(dtype)
+            data = ph.read()
+            assert data.dtype == np.dtype(dtype)
+            ph.seek(12345)
+            assert np.all(ph.read(10) == data[12345:12355])
+
+        # Avoid samples near the edges for which rounding may matter.
+        index = np.arange(50000) % 10000
+        assert np.all(data[(index < 1999) | (index > 2200)] == 0)
+        power = np.abs(data[(index > 2000) & (index < 2199)]) ** 2
+        expected = 50. * (2 if dtype == 'c8' else 1)
+        assert abs(power.mean() / expected - 1) < 0.05
+
+    def test_callable_profile_and_noise(self):
+        ph = PulsarSignalGenerator(
+            self.phase, lambda phase: np.where(phase < 0.5, 0., 3.),
+            (50000,), self.start_time, self.sample_rate,
+            samples_per_frame=5000, seed=2)
+        profile = self.fold(ph)
+        assert np.all(np.abs(profile[:50] / 2. - 1) < 0.2)
+        assert np.all(np.abs(profile[50:] / 8. - 1) < 0.2)
+        assert abs(profile[:50].mean() / 2. - 1) < 0.02
+        assert abs(profile[50:].mean() / 8. - 1) < 0.02
+
+    @pytest.mark.parametrize('sideband', (-1, 1))
+    def test_dispersion(self, sideband):
+        ph = PulsarSignalGenerator(self.phase, self.profile, (100000, 4),
+                                   self.start_time, self.sample_rate,
+                                   samples_per_frame=10000,
+                                   frequency=self.frequency,
+                                   sideband=sideband, dm=1., seed=3)
+        assert ph._pad_start > 0 and ph._pad_end > 0
+        assert ph.reference_frequency == 321.5 * u.MHz
+        # Lower frequencies arrive later.
+        dispersed = self.fold(ph)
+        peak = dispersed.argmax(0)
+        assert np.all(np.diff(peak) < 0)
+        dd = Dedisperse(ph, 1., reference_frequency=ph.reference_frequency)
+        dedispersed = self.fold(dd)
+        peak = dedispersed.argmax(0)
+        assert np.all((peak == 20) | (peak == 21))
+
+    def test_scattering(self):
+        ph = PulsarSignalGenerator(self.phase, self.profile, (100000,),
+                                   self.start_time, self.sample_rate,
+                                   samples_per_frame=20000,
+                                   scattering_time=1. * u.ms,
+                                   noise_level=0., seed=4)
+        assert ph._pad_start == 10000
+        profile = self.fold(ph)
+        assert profile.argmax() == 22
+        # Tail decays by a factor e per ms, i.e., per 10 bins.
+        ratio = profile[32:72:10] / profile[22:62:10]
+        assert np.all(np.abs(ratio * np.e - 1) < 0.15)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            PulsarSignalGenerator(self.phase, self.profile, (10000,),
+                                  self.start_time, self.sample_rate,
+                                  samples_per_frame=1000,
+                                  scattering_time=-1. * u.ms)
+        with pytest.raises(ValueError):
+            PulsarSignalGenerator(self.phase, self.profile, (10000,),
+                                  self.start_time, self.sample_rate,
+                                  samples_per_frame=1000, dm=1.)
+        with pytest.raises(ValueError):
+            PulsarSignalGenerator(self.phase, self.profile, (10000,),
+                                  self.start_time, self.sample_rate,
+                                  samples_per_frame=1000, dm=1.,
+                                  frequency=400. * u.MHz)
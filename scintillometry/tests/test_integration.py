@@ -1,6 +1,9 @@
 # Licensed under the GPLv3 - see LICENSE
 """Tests of integration and pulse folding."""
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import pytest
 import numpy as np
 import astropy.units as u
@@ -8,7 +11,8 @@ from astropy.time import Time
 
 from ..base import Task
 from ..generators import EmptyStreamGenerator
-from ..integration import Integrate, Fold, Stack
+from ..integration import (Integrate, Fold, MultiFold, OnlineFold, Stack,
+                           Gate, fold_parallel, evaluate_phase)
 from ..functions import Square
 from ..phases import Phase
 
@@ -122,6 +126,37 @@ class TestIntegrate(TestFakePulsarBase):
         assert np.allclose(data, ref_data)
         assert np.all(count == n)
 
+    @pytest.mark.parametrize('average', (True, False))
+    @pytest.mark.parametrize('samples_per_frame', (1, 7))
+    def test_integrate_n_fast_path(self, samples_per_frame, average):
+        # Integer steps use a fast path; check against general path.
+        ip = Integrate(self.sh, 11, start=5, average=average,
+                       samples_per_frame=samples_per_frame)
+        assert ip._n_step == 11
+        if not average:
+            assert ip.dtype['count'] == np.dtype('i1')
+        ref = Integrate(self.sh, 11 / self.sh.sample_rate, start=5,
+                        average=average)
+        assert ref._n_step is None
+        data = ip.read()
+        expected = ref.read(len(data))
+        assert data.dtype == expected.dtype
+        if average:
+            assert np.allclose(data, expected)
+        else:
+            assert np.all(data['count'] == 11)
+            assert np.allclose(data['data'], expected['data'])
+        ip.seek(3)
+        assert np.all(ip.read(2) == data[3:5])
+
+    def test_count_overflow(self):
+        # Counts that might not fit should raise rather than wrap around.
+        dtype = np.dtype([('data', 'f8'), ('count', 'i1')])
+        ip = Integrate(self.sh, 200 / self.sh.sample_rate, average=False,
+                       dtype=dtype)
+        with pytest.raises(OverflowError):
+            ip.read(1)
+
     @pytest.mark.parametrize('samples_per_frame', (1, 4, 10))
     @pytest.mark.parametrize('n', (1, 3))
     def test_integrate_n_part(self, n, samples_per_frame):
@@ -236,6 +271,19 @@ class TestIntegrate(TestFakePulsarBase):
         with pytest.raises(AssertionError):
             Integrate(self.sh, samples_per_frame=2)
 
+    def test_integrate_offsets(self):
+        ih = Integrate(self.sh, u.cycle / 25, self.phase)
+        ih._phase_block_size = 5000
+        samples = np.arange(ih.shape[0] + 1)
+        offsets = ih._get_offsets(samples)
+        ih_offsets = np.arange(self.sh.shape[0] + 1)
+        ih_phase = (self.phase(self.start_time +
+                               ih_offsets / self.sample_rate) -
+                    ih._start).to_value(u.cycle)
+        expected = np.interp((samples / ih.sample_rate).to_value(u.cycle),
+                             ih_phase, ih_offsets).round().astype(int)
+        assert np.all(offsets == expected)
+
 
 class TestFold(TestFakePulsarBase):
     def test_input_data(self):
@@ -304,6 +352,24 @@ class TestFold(TestFakePulsarBase):
         fr2 = fh2.read(9)
         assert np.all(fr2 == fr[1:])
 
+    def test_compact_count(self):
+        # 26 ms has 260 samples, so counts fit in int16.
+        fh = Fold(self.sh, self.n_phase, self.phase, step=26 * u.ms,
+                  average=False)
+        assert fh.dtype == np.dtype([('data', 'f8'), ('count', 'i2')])
+        fr = fh.read(2)
+        assert np.all(fr['count'].sum(1) == 260)
+        # Counts are the same for all elements of a sample.
+        assert np.all(fr['count'] == fr['count'][..., :1])
+        # Explicit dtype is respected.
+        dtype = np.dtype([('data', 'f4'), ('count', 'i8')])
+        fh2 = Fold(self.sh, self.n_phase, self.phase, step=26 * u.ms,
+                   average=False, dtype=dtype)
+        assert fh2.dtype == dtype
+        fr2 = fh2.read(2)
+        assert np.all(fr2['count'] == fr['count'])
+        assert np.allclose(fr2['data'], fr['data'])
+
     def test_folding_with_averaging(self):
         # Test averaging
         fh = Fold(self.sh, self.n_phase, self.phase, step=26 * u.ms,
@@ -366,7 +432,57 @@ class TestFold(TestFakePulsarBase):
         assert np.all(average[:, 0] == expected), \
             "On-gate power is incorrect."
 
+    @pytest.mark.parametrize('samples_per_frame', (1, 7))
+    @pytest.mark.parametrize('dtype', ('f4', 'c8'))
+    def test_methods_agree(self, dtype, samples_per_frame):
+        # Use a multi-dimensional, complex stream with different values.
+        def make_data(fh, data):
+            idx = fh.tell() + np.arange(data.shape[0])
+            data[:] = (np.sin(idx[:, np.newaxis, np.newaxis] *
+                              np.arange(1., 7.).reshape(3, 2))
+                       .astype(data.real.dtype))
+            if data.dtype.kind == 'c':
+                data.imag = np.cos(idx[:, np.newaxis, np.newaxis] * 0.1)
+            return data
+
+        eh = EmptyStreamGenerator(shape=(16000, 3, 2),
+                                  start_time=self.start_time,
+                                  sample_rate=self.sample_rate,
+                                  samples_per_frame=200, dtype=dtype)
+        sh = Task(eh, make_data)
+        step = 26 * u.ms
+        fh1 = Fold(sh, self.n_phase, self.phase, step, average=False,
+                   samples_per_frame=samples_per_frame, method='add.at')
+        fh2 = Fold(sh, self.n_phase, self.phase, step, average=False,
+                   samples_per_frame=samples_per_frame)
+        assert fh2.method == 'bincount'
+        fr1 = fh1.read()
+        fr2 = fh2.read()
+        assert fr2.dtype == fr1.dtype
+        assert np.all(fr2['count'] == fr1['count'])
+        assert np.allclose(fr2['data'], fr1['data'], atol=1e-4)
+
+    @pytest.mark.parametrize('samples_per_frame', (1, 7))
+    def test_phase_tolerance(self, samples_per_frame):
+        # Offset phases slightly, so that samples are not exactly on bin
+        # edges (where rounding errors could move them to another bin).
+        def phase(t):
+            return self.phase(t) + 0.001 * u.cycle
+
+        step = 26 * u.ms
+        fh1 = Fold(self.sh, self.n_phase, phase, step, average=False,
+                   samples_per_frame=samples_per_frame)
+        fh2 = Fold(self.sh, self.n_phase, phase, step, average=False,
+                   samples_per_frame=samples_per_frame,
+                   phase_tolerance=1e-6*u.cycle)
+        assert fh2.phase_tolerance == 1e-6*u.cycle
+        fr1 = fh1.read()
+        fr2 = fh2.read()
+        assert np.all(fr2 == fr1)
+
     def test_times_wrong(self):
+        with pytest.raises(ValueError):
+            Fold(self.sh, 8, self.phase, method='sum')
         with pytest.raises(ValueError):
             Fold(self.sh, 8, self.phase, start=self.start_time - 1. * u.s)
         with pytest.raises(ValueError):
@@ -377,6 +493,276 @@ class TestFold(TestFakePulsarBase):
             Fold(self.sh, 8, self.phase, samples_per_frame=2)
 
 
+class TestMultiFold(TestFakePulsarBase):
+    def phase2(self, t):
+        return 1.37 * self.phase(t) + 0.3 * u.cycle
+
+    @pytest.mark.parametrize('samples_per_frame', (1, 3))
+    @pytest.mark.parametrize('average', (True, False))
+    def test_against_fold(self, average, samples_per_frame):
+        step = 26 * u.ms
+        fh1 = Fold(self.sh, self.n_phase, self.phase, step, average=average,
+                   samples_per_frame=samples_per_frame)
+        fh2 = Fold(self.sh, 16, self.phase2, step, average=average,
+                   samples_per_frame=samples_per_frame)
+        mf = MultiFold(self.sh, (self.n_phase, 16), (self.phase, self.phase2),
+                       step, average=average,
+                       samples_per_frame=samples_per_frame)
+        assert mf.shape == (fh1.shape[0], self.n_phase + 16) + fh1.shape[2:]
+        assert mf.n_phases == (self.n_phase, 16)
+        data = mf.read()
+        p1, p2 = mf.split(data)
+        expected1 = fh1.read(len(data))
+        expected2 = fh2.read(len(data))
+        assert np.all(p1 == expected1)
+        assert np.all(p2 == expected2)
+
+    def test_reads_once(self):
+        n_read = []
+
+        def count_reads(fh, data):
+            n_read.append(len(data))
+            return self.pulse_simulate(fh, data)
+
+        sh = Task(self.eh, count_reads)
+        mf = MultiFold(sh, (8, 10, 12), (self.phase, self.phase2, self.phase))
+        mf.read()
+        assert sum(n_read) == self.shape[0]
+
+    def test_wrong_arguments(self):
+        with pytest.raises(ValueError):
+            MultiFold(self.sh, (8, 10), (self.phase,))
+
+
+def sine(fh, data):
+    idx = fh.tell() + np.arange(data.shape[0])
+    data[:] = np.sin(idx * 0.01).reshape((-1,) + (1,) * (data.ndim - 1))
+    return data
+
+
+def make_sine(shape, start_time, sample_rate):
+    eh = EmptyStreamGenerator(shape=shape, start_time=start_time,
+                              sample_rate=sample_rate, samples_per_frame=200,
+                              dtype='f4')
+    return Task(eh, sine)
+
+
+def linear_phase(t, start_time, f0):
+    return u.cycle * ((f0 * (t - start_time)).to(u.one) + 0.0003)
+
+
+class TestFoldParallel(TestFakePulsarBase):
+    def phase(self, t):
+        # Offset phases slightly, so that samples are not exactly on bin
+        # edges (where rounding errors could move them to another bin).
+        return super().phase(t) + 0.001 * u.cycle
+
+    def make_stream(self):
+        eh = EmptyStreamGenerator(shape=self.shape,
+                                  start_time=self.start_time,
+                                  sample_rate=self.sample_rate,
+                                  samples_per_frame=200, dtype=np.float)
+        return Task(eh, self.pulse_simulate)
+
+    @pytest.mark.parametrize('n_chunk', (1, 3, 4, 7))
+    @pytest.mark.parametrize('step', (None, 26 * u.ms, 1000))
+    def test_against_fold(self, step, n_chunk):
+        fh = Fold(self.sh, self.n_phase, self.phase, step, average=False)
+        expected = fh.read()
+        result = fold_parallel(self.make_stream, self.n_phase, self.phase,
+                               step, average=False, n_chunk=n_chunk,
+                               executor=ThreadPoolExecutor(2))
+        assert result.dtype == expected.dtype
+        assert result.shape == expected.shape
+        assert np.all(result['count'] == expected['count'])
+        if n_chunk <= len(expected):
+            assert np.all(result['data'] == expected['data'])
+        else:
+            assert np.allclose(result['data'], expected['data'])
+
+    def test_average_and_start(self):
+        start = self.start_time + 0.1 * u.s
+        fh = Fold(self.sh, self.n_phase, self.phase, 26 * u.ms, start=start)
+        expected = fh.read()
+        with ThreadPoolExecutor(3) as executor:
+            result = fold_parallel(self.make_stream, self.n_phase,
+                                   self.phase, 26 * u.ms, start=start,
+                                   n_chunk=3, executor=executor)
+            assert result.dtype == expected.dtype
+            assert np.all(result == expected)
+            # The executor should remain usable.
+            result2 = fold_parallel(self.make_stream, self.n_phase,
+                                    self.phase, 26 * u.ms, start=start,
+                                    n_chunk=2, executor=executor)
+            assert np.all(result2 == expected)
+
+    @pytest.mark.parametrize('average', (True, False))
+    def test_dtype(self, average):
+        # Fold itself needs a structured dtype for average=False.
+        fh = Fold(self.sh, self.n_phase, self.phase, 26 * u.ms,
+                  average=average, dtype='f4' if average else None)
+        expected = fh.read()
+        with ThreadPoolExecutor(2) as executor:
+            result = fold_parallel(self.make_stream, self.n_phase,
+                                   self.phase, 26 * u.ms, average=average,
+                                   dtype='f4', n_chunk=3, executor=executor)
+        if average:
+            assert result.dtype == expected.dtype == np.dtype('f4')
+            assert np.allclose(result, expected, equal_nan=True)
+        else:
+            assert result['data'].dtype == np.dtype('f4')
+            assert np.all(result['count'] == expected['count'])
+            assert np.allclose(result['data'], expected['data'])
+
+    def test_streams_closed(self):
+        streams = []
+
+        def make_stream():
+            streams.append(self.make_stream())
+            return streams[-1]
+
+        with ThreadPoolExecutor(2) as executor:
+            fold_parallel(make_stream, self.n_phase, self.phase, 26 * u.ms,
+                          n_chunk=3, executor=executor)
+        assert len(streams) == 4
+        assert all(stream.closed for stream in streams)
+
+    def test_count_overflow(self):
+        # 1000 samples per step do not fit in an int8 count.
+        dtype = np.dtype([('data', 'f8'), ('count', 'i1')])
+        with pytest.raises(OverflowError):
+            fold_parallel(self.make_stream, self.n_phase, self.phase, 1000,
+                          average=False, dtype=dtype, n_chunk=2,
+                          executor=ThreadPoolExecutor(2))
+
+    def test_processes(self):
+        maker = partial(make_sine, (4000, 3), self.start_time,
+                        self.sample_rate)
+        phase = partial(linear_phase, start_time=self.start_time, f0=self.F0)
+        expected = Fold(maker(), 16, phase, 0.1 * u.s).read()
+        result = fold_parallel(maker, 16, phase, 0.1 * u.s, n_chunk=2)
+        assert np.all(result == expected)
+
+
+class TestOnlineFold(TestFakePulsarBase):
+    def phase(self, t):
+        return super().phase(t) + 0.001 * u.cycle
+
+    def make_stream(self, n=None):
+        eh = EmptyStreamGenerator(shape=(n or self.shape[0],)+self.shape[1:],
+                                  start_time=self.start_time,
+                                  sample_rate=self.sample_rate,
+                                  samples_per_frame=200, dtype=np.float)
+        return Task(eh, self.pulse_simulate)
+
+    @pytest.mark.parametrize('step', (None, 26 * u.ms, 1000))
+    @pytest.mark.parametrize('sizes', ((16000,), (2000, 6000, 6200, 16000)))
+    def test_against_fold(self, step, sizes):
+        of = OnlineFold(self.make_stream(sizes[0]), self.n_phase, self.phase,
+                        step, average=False)
+        assert of.update() == sizes[0]
+        for previous, size in zip(sizes, sizes[1:]):
+            assert of.update(self.make_stream(size)) == size - previous
+        assert of.update() == 0
+        fh = Fold(self.sh, self.n_phase, self.phase, step, average=False)
+        expected = fh.read()
+        result = of.profiles
+        assert of.n_complete == (0 if step is None else len(expected))
+        assert result['data'].dtype == expected['data'].dtype
+        if step is not None:
+            assert result['count'].dtype == expected['count'].dtype
+        assert np.all(result['count'][:len(expected)] == expected['count'])
+        assert np.allclose(result['data'][:len(expected)], expected['data'])
+        assert result['count'][..., 0].sum() == self.shape[0]
+
+    def test_partial(self):
+        of = OnlineFold(self.make_stream(1600), self.n_phase, self.phase,
+                        100 * u.ms)
+        of.update()
+        assert of.n_complete == 1
+        assert of.profiles.shape == (2, self.n_phase, 2)
+        of.update(self.make_stream(5000))
+        assert of.n_complete == 5
+        partial = of.profiles
+        assert partial.shape == (5, self.n_phase, 2)
+        expected = Fold(self.sh, self.n_phase, self.phase,
+                        100 * u.ms).read(5)
+        assert np.allclose(partial, expected)
+
+    def test_short_initial_stream(self):
+        # Folding can only start once there is a full step of data.
+        of = OnlineFold(self.make_stream(200), self.n_phase, self.phase,
+                        26 * u.ms, average=False)
+        assert of.update() == 0
+        assert of.n_complete == 0
+        assert of.profiles.shape == (0, self.n_phase, 2)
+        assert of.update(self.make_stream()) == self.shape[0]
+        expected = Fold(self.sh, self.n_phase, self.phase, 26 * u.ms,
+                        average=False).read()
+        assert of.n_complete == len(expected)
+        assert np.all(of.profiles[:len(expected)] == expected)
+
+    def test_average_and_start(self):
+        start = self.start_time + 0.1 * u.s
+        of = OnlineFold(self.make_stream(4000), self.n_phase, self.phase,
+                        26 * u.ms, start=start)
+        of.update()
+        of.update(self.make_stream())
+        fh = Fold(self.sh, self.n_phase, self.phase, 26 * u.ms, start=start)
+        expected = fh.read()
+        assert np.allclose(of.profiles[:len(expected)], expected)
+
+
+class TestEvaluatePhase(TestFakePulsarBase):
+    def phase(self, t):
+        # Add a quadratic term, so that interpolation is not exact.
+        dt = (t - self.start_time).to(u.s)
+        return (u.cycle * (self.F0 * dt + 10. * u.Hz / u.s * dt ** 2)
+                ).to(u.cycle)
+
+    @pytest.mark.parametrize('tolerance', (1e-3 * u.cycle, 1e-6, 0.1 * u.deg))
+    def test_tolerance(self, tolerance):
+        offsets = np.arange(1000, 5000)
+        time = self.start_time + 0.1 * u.s
+        expected = self.phase(time + offsets / self.sample_rate)
+        phase = evaluate_phase(self.phase, time, offsets, self.sample_rate,
+                               tolerance)
+        assert type(phase) is type(expected)
+        error = np.abs((phase - expected).to_value(u.cycle))
+        tolerance = u.Quantity(tolerance, u.cycle).to_value(u.cycle)
+        assert np.all(error <= tolerance)
+        # End points are always on the grid.
+        assert np.all(error[[0, -1]] < 1e-9)
+
+    def test_few_evaluations(self):
+        n_evaluated = []
+
+        def phase(t):
+            n_evaluated.append(t.size)
+            return self.phase(t)
+
+        offsets = np.arange(1000, 5000)
+        time = self.start_time + 0.1 * u.s
+        evaluate_phase(phase, time, offsets, self.sample_rate, 1e-3)
+        assert sum(n_evaluated) < 100
+
+    def test_exact(self):
+        offsets = np.arange(1000, 5000)
+        time = self.start_time + 0.1 * u.s
+        expected = self.phase(time + offsets / self.sample_rate)
+        phase = evaluate_phase(self.phase, time, offsets, self.sample_rate)
+        assert np.all(phase == expected)
+        # If the tolerance is too tight, phases are calculated directly.
+        phase2 = evaluate_phase(self.phase, time, offsets, self.sample_rate,
+                                1e-20)
+        assert np.all(phase2 == expected)
+
+
+class TestEvaluatePhaseWithPhase(TestEvaluatePhase):
+    def phase(self, t):
+        return Phase(super().phase(t))
+
+
 class TestFoldwithPhase(TestFold, UsePhaseClass):
     pass
 
@@ -428,6 +814,54 @@ class TestStack(TestFakePulsarBase):
         data = fh.read()
         assert np.all(data == ref_data[13:])
 
+    @pytest.mark.parametrize('samples_per_frame', (1, 16))
+    def test_against_integrate(self, samples_per_frame):
+        # Use a phase such that bins contain different numbers of samples.
+        def phase(t):
+            return self.phase(t) * 1.03
+
+        n_phase = 30
+        fh = Stack(self.sh, n_phase, phase, average=False,
+                   samples_per_frame=samples_per_frame)
+        data = fh.read()
+        ref = Integrate(self.sh, u.cycle / n_phase, phase, average=False)
+        expected = ref.read(data.shape[0] * n_phase).reshape(data.shape)
+        assert data.dtype == expected.dtype
+        assert np.all(data['count'] == expected['count'])
+        assert np.allclose(data['data'], expected['data'])
+
+    def test_phase_table(self):
+        ref_data = self.raw_data.reshape(-1, 25, 5, 2).mean(2)
+        n_evaluated = []
+
+        def phase(t):
+            n_evaluated.append(t.size)
+            return self.phase(t)
+
+        fh = Stack(self.sh, 25, phase)
+        n_init = sum(n_evaluated)
+        # Use small blocks to ensure we go through several.
+        fh.ih._phase_block_size = 1000
+        fh.seek(100)
+        data = fh.read(5)
+        assert np.all(data == ref_data[100:105])
+        fh.seek(3)
+        data = fh.read(2)
+        assert np.all(data == ref_data[3:5])
+        data = fh.read()
+        assert np.all(data == ref_data[5:])
+        # Phases are only calculated for a few points per block.
+        assert sum(n_evaluated) - n_init < 0.01 * self.sh.shape[0]
+        assert len(fh.ih._phase_table) == 16
+
+    def test_phase_tolerance(self):
+        ref_data = self.raw_data.reshape(-1, 25, 5, 2).mean(2)
+        fh = Stack(self.sh, 25, self.phase, samples_per_frame=16,
+                   phase_tolerance=1e-6*u.cycle)
+        assert fh.ih.phase_tolerance == 1e-6*u.cycle
+        data = fh.read()
+        assert np.all(data == ref_data)
+
     def test_offset(self):
         ref_data = self.raw_data[124:-1].reshape(-1, 25, 5, 2).mean(2)
 
@@ -454,3 +888,66 @@ class TestStack(TestFakePulsarBase):
         # But not everything works, like asking for the time...
         with pytest.raises(Exception):
             ih.time
+
+
+class TestGate(TestFakePulsarBase):
+    @pytest.mark.parametrize('samples_per_frame', (1, 7))
+    def test_basics(self, samples_per_frame):
+        fh = Gate(self.sh, self.phase, (-0.04, 0.04),
+                  samples_per_frame=samples_per_frame)
+        assert fh.n_window == 10
+        n_pulse = 127 - 127 % samples_per_frame
+        assert fh.shape == (n_pulse, 10, 2)
+        assert fh.sample_rate == 1. / u.cycle
+        expected_offsets = 120 + 125 * np.arange(n_pulse)
+        assert np.all(fh.window_offsets == expected_offsets)
+        assert abs(fh.start_time - (self.start_time + 12 * u.ms)) < 1. * u.ns
+        assert abs(fh.stop_time - fh.window_times[-1] - 1. * u.ms) < 1. * u.ns
+        data = fh.read()
+        expected = self.raw_data[expected_offsets[:, np.newaxis] +
+                                 np.arange(10)]
+        assert np.all(data == expected)
+        assert np.all(data[:, 5] == 10.)
+        fh.seek(3)
+        assert abs(fh.time - fh.window_times[3]) < 1. * u.ns
+        assert np.all(fh.read(1) == expected[3:4])
+
+    def test_start_and_n_window(self):
+        fh = Gate(self.sh, self.phase, 0.5 * u.cycle + [-30., 30.] * u.deg,
+                  n_window=20, start=1000)
+        assert fh.shape == (120, 20, 2)
+        assert fh.window_offsets[0] == 1052
+        assert np.all(fh.read()[:, 10] == 0.125)
+
+    @pytest.mark.parametrize('n_window', (125, 130))
+    def test_touching_windows(self, n_window):
+        # Windows that touch or overlap are read in one go.
+        fh = Gate(self.sh, self.phase, (-0.5, 0.5), n_window=n_window,
+                  samples_per_frame=4)
+        data = fh.read()
+        offsets = fh.window_offsets
+        assert np.all(np.diff(offsets) <= n_window)
+        expected = self.raw_data[offsets[:, np.newaxis] +
+                                 np.arange(n_window)]
+        assert np.all(data == expected)
+
+    def test_followed_by_integration(self):
+        fh = Gate(self.sh, self.phase, (-0.04, 0.04))
+        ih = Integrate(Square(fh))
+        profile = ih.read()
+        assert profile.shape == (1, 10, 2)
+        assert np.all(profile[0, 5] == 100.)
+        assert np.all(profile[0, :5] == 0.125 ** 2)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Gate(self.sh, self.phase, (0.1, -0.1))
+        with pytest.raises(ValueError):
+            Gate(self.sh, self.phase, (0., 0.1, 0.2))
+        with pytest.raises(ValueError):
+            Gate(self.sh, self.phase, (0., 0.1), start=15000,
+                 samples_per_frame=10)
+
+
+class TestGatewithPhase(TestGate, UsePhaseClass):
+    pass
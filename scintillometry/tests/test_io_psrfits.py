@@ -8,6 +8,7 @@ import numpy as np
 import astropy.units as u
 from astropy.coordinates import Longitude, Latitude, EarthLocation
 from astropy.time import Time
+from astropy.io import fits
 
 from ..io import psrfits
 
@@ -119,3 +120,71 @@ class TestFoldRead(TestRead):
             weighted = reader.read(1)
             weights = self.reader.ih.hdu.data['DAT_WTS']
         assert np.all(weighted == unweighted * weights.reshape(-1, 1))
+
+
+class TestMultiRowRead:
+    """Test bulk decoding on a synthetic file with several rows."""
+    def setup(self):
+        self.nrow, self.npol, self.nchan, self.nbin = 5, 2, 3, 16
+        rng = np.random.default_rng(1)
+        self.raw = rng.integers(-1000, 1000, size=(
+            self.nrow, self.npol, self.nchan, self.nbin), dtype='i2')
+        self.scale = rng.uniform(0.5, 2., size=(
+            self.nrow, self.npol * self.nchan)).astype('f4')
+        self.offs = rng.uniform(-1., 1., size=(
+            self.nrow, self.npol * self.nchan)).astype('f4')
+        self.weights = rng.uniform(0., 1., size=(
+            self.nrow, self.nchan)).astype('f4')
+        primary = fits.PrimaryHDU()
+        primary.header.update(FITSTYPE='PSRFITS', OBS_MODE='PSR',
+                              STT_IMJD=55000, STT_SMJD=0, STT_OFFS=0.)
+        n = self.npol * self.nchan
+        subint = fits.BinTableHDU.from_columns([
+            fits.Column(name='TSUBINT', format='D',
+                        array=np.full(self.nrow, 10.)),
+            fits.Column(name='DAT_WTS', format='{}E'.format(self.nchan),
+                        array=self.weights),
+            fits.Column(name='DAT_OFFS', format='{}E'.format(n),
+                        array=self.offs),
+            fits.Column(name='DAT_SCL', format='{}E'.format(n),
+                        array=self.scale),
+            fits.Column(name='DATA', format='{}I'.format(n * self.nbin),
+                        dim='({},{},{})'.format(self.nbin, self.nchan,
+                                                self.npol),
+                        array=self.raw)], name='SUBINT')
+        subint.header.update(NBIN=self.nbin, NCHAN=self.nchan,
+                             NPOL=self.npol, POL_TYPE='AABB', ZERO_OFF=10.)
+        self.hdu_list = fits.HDUList([primary, subint])
+
+    def expected(self, weighted):
+        scale_shape = (self.nrow, self.npol, self.nchan, 1)
+        expected = ((self.raw - 10.) * self.scale.reshape(scale_shape) +
+                    self.offs.reshape(scale_shape))
+        if weighted:
+            expected *= self.weights.reshape(self.nrow, 1, self.nchan, 1)
+        return expected.transpose(0, 3, 2, 1)
+
+    @pytest.mark.parametrize('weighted', (False, True))
+    def test_read(self, weighted):
+        reader, = psrfits.get_readers(self.hdu_list, weighted=weighted)
+        assert reader.shape == (self.nrow, self.nbin, self.nchan, self.npol)
+        assert reader.dtype == np.dtype('f4')
+        expected = self.expected(weighted)
+        data = reader.read()
+        assert data.dtype == np.dtype('f4')
+        assert np.allclose(data, expected, rtol=1e-6, atol=1e-4)
+        reader.seek(1)
+        assert np.all(reader.read(3) == data[1:4])
+        out = np.empty((2,) + reader.sample_shape, reader.dtype)
+        reader.seek(3)
+        result = reader.read(out=out)
+        assert result is out
+        assert np.all(out == data[3:])
+        with pytest.raises(EOFError):
+            reader.read(1)
+        reader.seek(0)
+        with pytest.raises(AssertionError):
+            reader.read(out=np.empty((2, self.nbin), reader.dtype))
+        # Single rows keep their original axis order.
+        assert np.all(reader.ih.read_data_row(2, weighted=weighted) ==
+                      data[2].T)
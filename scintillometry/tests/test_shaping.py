@@ -1,15 +1,18 @@
 # Licensed under the GPLv3 - see LICENSE
+import io
 
 import pytest
 import numpy as np
 from numpy.testing import assert_array_equal
 import astropy.units as u
+from baseband import vdif
+from baseband.data import SAMPLE_VDIF
 
-from ..base import SetAttribute
+from ..base import SetAttribute, Task
 from ..shaping import (Reshape, Transpose, ReshapeAndTranspose,
                        ChangeSampleShape, GetItem)
 
-from .common import UseVDIFSampleWithAttrs
+from .common import UseVDIFSampleWithAttrs, UseDADASample
 
 
 class TestReshape(UseVDIFSampleWithAttrs):
@@ -211,8 +214,112 @@ class TestGetItem(UseVDIFSampleWithAttrs):
         assert gih.polarization.shape == ()
         assert_array_equal(gih.polarization, rh.polarization[0])
 
+    @pytest.mark.parametrize('item', (1, slice(2, 6), [0, 3]))
+    def test_subset_pushdown(self, item):
+        """Selection should be passed on to the baseband reader."""
+        fh = self.fh
+        ref_data = fh.read()[:, item]
+        raw_offset = self._fh.fh_raw.tell()
+        gih = GetItem(fh, item)
+        assert gih._source is not self._fh
+        assert gih._source.fh_raw is not self._fh.fh_raw
+        assert self._fh.fh_raw.tell() == raw_offset
+        assert gih._source.subset == (item,)
+        assert gih._tasks == ()
+        assert gih.sample_shape == ref_data.shape[1:]
+        assert_array_equal(gih.read(), ref_data)
+        gih.seek(1000)
+        assert_array_equal(gih.read(10), ref_data[1000:1010])
+        # Reading from the original stream should still work.
+        fh.seek(0)
+        assert_array_equal(fh.read()[:, item], ref_data)
+        # The reader opened for the selection is closed with the task.
+        subset_reader = gih._source
+        gih.close()
+        assert subset_reader.fh_raw.closed
+        assert not self._fh.fh_raw.closed
+
+    def test_no_pushdown_after_reshape(self):
+        rh = Reshape(self.fh, (4, 2))
+        gih = GetItem(rh, (slice(None), 1))
+        assert gih._source is self.fh
+        assert gih._tasks == (rh.task, gih.task)
+
+    def test_no_pushdown_for_in_memory_file(self):
+        with open(SAMPLE_VDIF, 'rb') as f:
+            raw = io.BytesIO(f.read())
+        fh = vdif.open(raw, 'rs')
+        ref_data = fh.read()[:, 1]
+        gih = GetItem(fh, 1)
+        assert gih._subset_reader is None
+        assert gih._source is fh
+        assert_array_equal(gih.read(), ref_data)
+        fh.close()
+
+    def test_no_pushdown_for_other_readers(self):
+        # A reader that is not a baseband file reader is used as is.
+        ref_data = self.fh.read()[:, 1]
+        gih = GetItem(Task(self.fh, lambda data: data), 1)
+        assert gih._subset_reader is None
+        assert_array_equal(gih.read(), ref_data)
+
     def test_wrong_item(self):
         with pytest.raises(IndexError):
             GetItem(self.fh, 10)
         with pytest.raises(IndexError):
             GetItem(self.fh, (1, 1))
+
+
+class TestGetItemDADA(UseDADASample):
+    def test_subset_pushdown(self):
+        fh = self.fh
+        ref_data = fh.read()[:, 1]
+        gih = GetItem(fh, 1)
+        assert gih._source.subset == (1,)
+        assert_array_equal(gih.read(), ref_data)
+
+
+class TestComposition(UseVDIFSampleWithAttrs):
+    """Test that chained shape changes read only from the original stream."""
+
+    def test_chain(self):
+        fh = self.fh
+        ref_data = fh.read().reshape(-1, 4, 2).transpose(0, 2, 1)[:, 1, :2]
+        rh = Reshape(fh, (4, 2))
+        th = Transpose(rh, (2, 1))
+        gih = GetItem(th, (1, slice(None, 2)))
+        assert gih._source is fh
+        assert gih._tasks == (rh.task, th.task, gih.task)
+        assert gih.frequency.shape == (2,)
+        assert_array_equal(gih.frequency, fh.frequency[:4:2])
+        assert gih.polarization.shape == ()
+        assert_array_equal(gih.polarization, fh.polarization[1])
+        # Intermediate stages should not be read.
+        rh.seek(0)
+        th.seek(0)
+        data = gih.read()
+        assert_array_equal(data, ref_data)
+        assert rh.tell() == 0
+        assert th.tell() == 0
+        # Reading from a later point should work too.
+        gih.seek(100)
+        assert_array_equal(gih.read(10), ref_data[100:110])
+
+    def test_method_not_bypassed(self):
+        fh = self.fh
+
+        def task(ih, data):
+            return data.reshape(-1, 4, 2)
+
+        st = ChangeSampleShape(fh, task, method=True)
+        assert not st._composable
+        gih = GetItem(st, 0)
+        assert gih._source is st
+        assert gih._tasks == (gih.task,)
+        ref_data = fh.read().reshape(-1, 4, 2)[:, 0]
+        assert_array_equal(gih.read(), ref_data)
+        # A function task, however, is composable.
+        st2 = ChangeSampleShape(fh, lambda data: data.reshape(-1, 4, 2))
+        assert st2._composable
+        gih2 = GetItem(st2, 0)
+        assert gih2._source is fh